@@ -0,0 +1,146 @@
+"""Run many persona/job queries over a shared corpus in one pass
+
+    python batch_run.py [--config config.json] [--jobs jobs.json] [--output-root output/batch]
+
+jobs.json is a list of job objects. Each names a configured "collection"
+(whose persona, job_to_be_done, job_query and input_folder are the defaults)
+and/or gives those fields directly, plus optional "top_k_matches" /
+"top_k_output" and a "name" for its output folder (default: the collection
+name; names must be unique). Without --jobs every configured collection is
+one job.
+
+Every distinct PDF is parsed and embedded once across all jobs, the job
+queries are scored against the corpus as one similarity matrix per
+top_k_matches value, and each job gets its own
+<output-root>/<name>/challenge1b_output.json.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from extract1btent import (encoder_settings, load_config, open_artifact_cache, open_embedding_cache,
+                           print_encode_stats, resolve_query)
+from src.collection_pipeline import collection_sections, embed_collection, load_collection
+from src.document_model import DEFAULT_TEXT_PROFILE
+from src.model_registry import get_model, warm_up
+from src.round1b_formatter import Round1BFormatter
+from src.semantic_matcher import DEFAULT_TOKEN_BUDGET, match_collection_to_queries
+
+
+def load_jobs(jobs_path, config):
+    """Read the job list, or make one job per configured collection"""
+    if not jobs_path:
+        return [{"collection": name, "name": name} for name in config["collections"]]
+    with open(jobs_path, "r", encoding="utf-8") as f:
+        jobs = json.load(f)
+    if not isinstance(jobs, list):
+        raise ValueError(f"{jobs_path} must hold a JSON list of jobs")
+    return jobs
+
+
+def job_output_name(job, index):
+    name = job.get("name") or job.get("collection") or f"job_{index + 1}"
+    return name.replace(os.sep, "_").replace("/", "_")
+
+
+def run_batch(config, jobs, output_root):
+    """Answer every job against one shared corpus and write one output file per job"""
+    perf_settings = config.get("performance_settings", {})
+    start = time.perf_counter()
+
+    resolved = [resolve_query(config, job) for job in jobs]
+    output_names = [job_output_name(job, index) for index, job in enumerate(jobs)]
+    duplicates = sorted({name for name in output_names if output_names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Jobs share an output folder name: {', '.join(duplicates)} "
+                         f"(give each job a distinct \"name\")")
+    pdf_paths_by_folder = {}
+    for job in resolved:
+        folder = job["input_folder"]
+        if folder not in pdf_paths_by_folder:
+            pdf_paths_by_folder[folder] = sorted(glob.glob(os.path.join(folder, "*.pdf")))
+    all_paths = list(dict.fromkeys(p for paths in pdf_paths_by_folder.values() for p in paths))
+    print(f"{len(jobs)} jobs over {len(pdf_paths_by_folder)} folders ({len(all_paths)} PDFs)")
+
+    encoder = get_model(**encoder_settings(config))
+    embedding_cache = open_embedding_cache(config)
+    artifact_cache = open_artifact_cache(config)
+
+    # Parse and embed the union of all folders once; identical PDFs share one parse
+    corpus = load_collection(
+        all_paths, perf_settings.get("parallel_workers", 1),
+        perf_settings.get("text_extraction_profile", DEFAULT_TEXT_PROFILE),
+        artifact_cache=artifact_cache,
+        collapse_furniture=perf_settings.get("collapse_page_furniture", False)
+    )
+    embed_collection(corpus, encoder, embedding_cache=embedding_cache,
+                     artifact_cache=artifact_cache,
+                     batch_size=perf_settings.get("encode_batch_size", 64),
+                     token_budget=perf_settings.get("encode_token_budget", DEFAULT_TOKEN_BUDGET))
+
+    # One queries x candidates score matrix per top_k_matches value; jobs are not
+    # ranked at a larger k and sliced, as torch.topk may then pick other ties
+    matches_per_job = [None] * len(resolved)
+    for top_k in dict.fromkeys(job["top_k_matches"] for job in resolved):
+        indices = [i for i, job in enumerate(resolved) if job["top_k_matches"] == top_k]
+        matches = match_collection_to_queries(
+            corpus.candidates_by_pdf, [resolved[i]["job_query"] for i in indices],
+            top_k=top_k, model=encoder, embedding_cache=embedding_cache,
+            candidate_embeddings=corpus.embeddings_by_pdf
+        )
+        for i, job_matches in zip(indices, matches):
+            matches_per_job[i] = job_matches
+
+    output_paths = []
+    for index, (job, matches_by_pdf) in enumerate(zip(resolved, matches_per_job)):
+        collection = corpus.subset(pdf_paths_by_folder[job["input_folder"]])
+        job_matches = {p: matches_by_pdf[p] for p in collection.pdf_paths if p in matches_by_pdf}
+
+        formatter = Round1BFormatter(collection.input_documents, job["persona"],
+                                     job["job_to_be_done"], top_k=job["top_k_output"],
+                                     bounded=perf_settings.get("bounded_output", False))
+        for pdf_path, sections, error in collection_sections(collection, job_matches):
+            if error is not None:
+                print(f"Error processing {os.path.basename(pdf_path)}: {error}")
+            elif sections:
+                formatter.add_pdf_results(os.path.basename(pdf_path), sections)
+
+        output_folder = os.path.join(output_root, output_names[index])
+        output_paths.append(formatter.save_round1b_output(output_folder))
+
+    artifact_stats = artifact_cache.stats()
+    print(f"✓ {len(jobs)} jobs answered in {time.perf_counter() - start:.2f} s")
+    print(f"Artifact cache: {artifact_stats['memory_hits']} in-memory hits, "
+          f"{artifact_stats['disk_hits']} disk hits, {artifact_stats['misses']} misses")
+    print_encode_stats()
+    if embedding_cache is not None:
+        embedding_cache.close()
+    artifact_cache.close()
+    return output_paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default=os.environ.get("CONFIG_PATH", "config.json"))
+    parser.add_argument("--jobs", help="JSON list of jobs (default: every configured collection)")
+    parser.add_argument("--output-root", default=None,
+                        help="default: <output_settings.output_folder>/batch")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    try:
+        jobs = load_jobs(args.jobs, config)
+        output_root = args.output_root or os.path.join(config["output_settings"]["output_folder"],
+                                                       "batch")
+        warm_up(**encoder_settings(config))
+        run_batch(config, jobs, output_root)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Encoder batching: fixed batch size vs length-bucketed token budgets
+
+    python benchmarks/bench_encode_batching.py [--backends torch onnx-int8] [--budgets 4096 8192]
+
+Encodes the distinct heading candidates of the Challenge_1b sample PDFs with
+each backend, once in input order with a fixed batch size (what a plain
+model.encode loop would send), once longest first with the same batch size,
+and once per token budget through semantic_matcher.encode_texts. Reports
+batches, padded tokens, the share of padding, tokens/sec and the largest
+difference from the fixed-batch embeddings, which must stay at float noise
+so results come back unchanged and in their original order.
+"""
+import argparse
+import os
+import time
+
+from bench_utils import REPO_ROOT, print_table, sample_pdfs
+
+import numpy as np
+
+from src.collection_pipeline import extract_pdf_candidates
+from src.model_registry import DEFAULT_MODEL_NAME, clear_models, get_model
+from src.semantic_matcher import encode_stats, encode_texts, token_lengths
+
+BACKEND_OPTIONS = {
+    "torch": {"backend": "torch"},
+    "onnx": {"backend": "onnx", "quantize": False},
+    "onnx-int8": {"backend": "onnx", "quantize": True},
+}
+
+
+def fixed_batches(encoder, texts, lengths, batch_size, sort):
+    """Encode in batches of batch_size; return (embeddings, batches, padded tokens, seconds)"""
+    order = np.argsort(-lengths, kind="stable") if sort else np.arange(len(texts))
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    embeddings = np.zeros((len(texts), 0), dtype=np.float32)
+    start = time.perf_counter()
+    for batch in batches:
+        vectors = np.asarray(encoder.encode([texts[i] for i in batch], batch_size=len(batch),
+                                            convert_to_numpy=True), dtype=np.float32)
+        if not embeddings.shape[1]:
+            embeddings = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+        embeddings[batch] = vectors
+    seconds = time.perf_counter() - start
+    padded = sum(len(batch) * int(lengths[batch].max()) for batch in batches)
+    return embeddings, len(batches), padded, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx-int8"],
+                        choices=list(BACKEND_OPTIONS))
+    parser.add_argument("--budgets", type=int, nargs="+", default=[4096, 8192, 16384])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-seq-length", type=int, default=128)
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--onnx-dir", default=os.path.join(REPO_ROOT, "models", "onnx"))
+    args = parser.parse_args()
+
+    texts = []
+    for pdf_path in sample_pdfs():
+        _, candidates = extract_pdf_candidates(pdf_path)
+        texts.extend(candidate["text"] for candidate in candidates)
+    texts = list(dict.fromkeys(texts))
+
+    for name in args.backends:
+        encoder = get_model(args.model, device="cpu", cache_dir=args.cache_dir,
+                            onnx_dir=args.onnx_dir, max_seq_length=args.max_seq_length,
+                            **BACKEND_OPTIONS[name])
+        lengths = token_lengths(encoder, texts)
+        print(f"\n{name}: {len(texts)} distinct candidates, {int(lengths.sum())} tokens "
+              f"(median {int(np.median(lengths))}, max {int(lengths.max())})")
+        encoder.encode(texts[:args.batch_size], batch_size=args.batch_size)
+
+        rows = []
+        reference = None
+        for label, sort in ((f"batch {args.batch_size}, input order", False),
+                            (f"batch {args.batch_size}, longest first", True)):
+            embeddings, batches, padded, seconds = fixed_batches(encoder, texts, lengths,
+                                                                 args.batch_size, sort)
+            if reference is None:
+                reference = embeddings
+            rows.append((label, batches, padded, f"{1 - lengths.sum() / padded:.0%}",
+                         f"{lengths.sum() / seconds:.0f}",
+                         f"{np.abs(embeddings - reference).max():.1e}"))
+
+        for budget in args.budgets:
+            encode_stats(reset=True)
+            embeddings = encode_texts(texts, encoder, token_budget=budget)
+            stats = encode_stats(reset=True)
+            rows.append((f"budget {budget} tokens", stats["batches"], stats["padded_tokens"],
+                         f"{1 - stats['tokens'] / stats['padded_tokens']:.0%}",
+                         f"{stats['tokens_per_second']:.0f}",
+                         f"{np.abs(embeddings - reference).max():.1e}"))
+
+        print_table(("batching", "batches", "padded tokens", "padding", "tokens/s",
+                     "max |diff|"), rows)
+        clear_models()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Encoder backends: cold start, encoding throughput and ranking agreement
+
+    python benchmarks/bench_encoder_backends.py [--backends torch onnx onnx-int8] [--threads 1 4]
+
+Encodes the heading candidates of the Challenge_1b sample PDFs with each
+backend (onnx = exported float32 model, onnx-int8 = dynamically quantized)
+and reports:
+- cold start: a fresh interpreter importing, loading and running one encode;
+- candidates/sec at each intra-op thread count;
+- mean cosine between each backend's embeddings and torch's;
+- how many per-PDF top-5 lists for the configured job queries differ from
+  torch's, by order and by membership.
+The first ONNX run exports the model into --onnx-dir.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from bench_utils import REPO_ROOT, SAMPLE_ROOT, print_table, sample_pdfs
+
+import numpy as np
+
+from src.collection_pipeline import extract_pdf_candidates
+from src.model_registry import DEFAULT_MODEL_NAME, clear_models, get_model
+from src.semantic_matcher import cosine_scores
+
+BACKEND_OPTIONS = {
+    "torch": {"backend": "torch"},
+    "onnx": {"backend": "onnx", "quantize": False},
+    "onnx-int8": {"backend": "onnx", "quantize": True},
+}
+
+
+def load_encoder(name, args, threads=None):
+    return get_model(args.model, device="cpu", cache_dir=args.cache_dir, threads=threads,
+                     onnx_dir=args.onnx_dir, **BACKEND_OPTIONS[name])
+
+
+def cold_start(name, args):
+    """Seconds for a new interpreter to load the backend and encode one text"""
+    code = (
+        "import sys, time; start = time.perf_counter(); sys.path.insert(0, %r)\n"
+        "from src.model_registry import get_model\n"
+        "get_model(%r, device='cpu', cache_dir=%r, onnx_dir=%r, **%r).encode(['warm up'])\n"
+        "print(time.perf_counter() - start)"
+    ) % (REPO_ROOT, args.model, args.cache_dir, args.onnx_dir, BACKEND_OPTIONS[name])
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def top_k_lists(encoder, texts_by_pdf, queries, k):
+    """{(query, pdf): top-k candidate indices} for every query and PDF"""
+    query_embeddings = encoder.encode(queries, convert_to_numpy=True)
+    results = {}
+    for pdf, texts in texts_by_pdf.items():
+        embeddings = np.asarray(encoder.encode(texts, batch_size=64, convert_to_numpy=True))
+        for query, query_embedding in zip(queries, query_embeddings):
+            scores = cosine_scores(query_embedding, embeddings)
+            results[(query, pdf)] = np.argsort(-scores, kind="stable")[:k].tolist()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=list(BACKEND_OPTIONS),
+                        choices=list(BACKEND_OPTIONS))
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--onnx-dir", default=os.path.join(REPO_ROOT, "models", "onnx"))
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--config", default=os.path.join(REPO_ROOT, "config.json"))
+    args = parser.parse_args()
+    args.threads = list(dict.fromkeys(args.threads))
+
+    texts_by_pdf = {}
+    for pdf_path in sample_pdfs():
+        _, candidates = extract_pdf_candidates(pdf_path)
+        if candidates:
+            texts_by_pdf[os.path.relpath(pdf_path, SAMPLE_ROOT)] = [c["text"] for c in candidates]
+    texts = list(dict.fromkeys(t for pdf_texts in texts_by_pdf.values() for t in pdf_texts))
+    with open(args.config, "r", encoding="utf-8") as f:
+        queries = [c["job_query"] for c in json.load(f)["collections"].values()]
+    print(f"{len(texts)} distinct candidates from {len(texts_by_pdf)} PDFs, "
+          f"{len(queries)} job queries")
+
+    # Export the ONNX models up front so cold starts time loading only
+    for name in args.backends:
+        load_encoder(name, args)
+    clear_models()
+
+    rows = []
+    reference = reference_lists = None
+    for name in args.backends:
+        load_time = cold_start(name, args)
+        for threads in args.threads:
+            encoder = load_encoder(name, args, threads)
+            encoder.encode(texts[:args.batch_size], batch_size=args.batch_size)
+            start = time.perf_counter()
+            embeddings = np.asarray(encoder.encode(texts, batch_size=args.batch_size,
+                                                   convert_to_numpy=True), dtype=np.float32)
+            rate = len(texts) / (time.perf_counter() - start)
+            lists = top_k_lists(encoder, texts_by_pdf, queries, args.top_k)
+            clear_models()
+
+            if reference is None:
+                reference, reference_lists = embeddings, lists
+            unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+            ref_unit = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+            order_diffs = sum(lists[key] != reference_lists[key] for key in lists)
+            set_diffs = sum(set(lists[key]) != set(reference_lists[key]) for key in lists)
+            rows.append((name, threads, f"{load_time:.2f} s", f"{rate:.0f}",
+                         f"{(unit * ref_unit).sum(axis=1).mean():.5f}",
+                         f"{order_diffs}/{len(lists)}", f"{set_diffs}/{len(lists)}"))
+
+    print_table(("backend", "threads", "cold start", "candidates/s", f"cos vs {args.backends[0]}",
+                 f"top-{args.top_k} order diffs", "set diffs"), rows)
+
+
+if __name__ == "__main__":
+    main()
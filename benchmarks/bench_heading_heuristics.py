@@ -0,0 +1,82 @@
+"""Heading heuristics: dict-per-span scoring vs the columnar span table
+
+    python benchmarks/bench_heading_heuristics.py [--repeat 3] [pdf ...]
+
+For each PDF, checks the columnar extractor returns the same candidates as the
+previous dict-per-span code (kept in heading_extractor_docker), then reports
+parse + heuristic wall time for both and the memory held by the parsed form.
+"""
+import argparse
+import tracemalloc
+
+from bench_utils import print_table, sample_pdfs, timed
+
+import fitz  # PyMuPDF
+
+from src.document_model import parse_document
+from src.heading_extractor import extract_heading_candidates_from_doc
+from src.heading_extractor_docker import extract_heading_candidates_from_doc as legacy_candidates
+from src.heading_features import describe_reasons
+
+
+def legacy_parse(doc):
+    """The previous parsed form: one dict per line and per span"""
+    pages = []
+    for page in doc:
+        lines = []
+        for block in page.get_text("dict")["blocks"]:
+            for line in block.get("lines", []):
+                spans = [{"text": s["text"], "font": s["font"], "size": s["size"],
+                          "flags": s["flags"], "bbox": tuple(s["bbox"])} for s in line["spans"]]
+                lines.append({"bbox": tuple(line["bbox"]),
+                              "size": max((s["size"] for s in spans), default=0.0),
+                              "spans": spans})
+        pages.append(lines)
+    return pages
+
+
+def retained_bytes(fn, *args):
+    """Bytes still allocated by fn's result once it returns"""
+    tracemalloc.start()
+    result = fn(*args)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def columnar_candidates(doc):
+    return extract_heading_candidates_from_doc(parse_document(doc))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = []
+    for pdf_path in sample_pdfs(args.pdfs):
+        with fitz.open(pdf_path) as doc:
+            expected = legacy_candidates(doc)
+            actual = columnar_candidates(doc)
+            for candidate in actual:
+                candidate["reasons"] = describe_reasons(candidate.pop("reason_mask"))
+                del candidate["x0"]
+            assert actual == expected, f"candidates differ for {pdf_path}"
+
+            _, old_time = timed(legacy_candidates, doc, repeat=args.repeat)
+            _, new_time = timed(columnar_candidates, doc, repeat=args.repeat)
+            old_bytes = retained_bytes(legacy_parse, doc)
+            new_bytes = retained_bytes(parse_document, doc)
+            span_count = parse_document(doc).span_count
+        rows.append((pdf_path.rsplit("/", 1)[-1][:40], span_count,
+                     f"{old_time * 1000:.1f} ms", f"{new_time * 1000:.1f} ms",
+                     f"{old_bytes / 1024:.0f} KiB", f"{new_bytes / 1024:.0f} KiB"))
+
+    print_table(("pdf", "spans", "dict time", "columnar time", "dict memory", "columnar memory"),
+                rows)
+
+
+if __name__ == "__main__":
+    main()
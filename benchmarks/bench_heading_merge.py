@@ -0,0 +1,57 @@
+"""Layout/heuristic heading merge: nested-loop matching vs per-page bisect window
+
+    python benchmarks/bench_heading_merge.py [--sizes 500 2000 8000] [--pages 200]
+
+Builds synthetic documents with the given number of layout and heuristic
+headings, checks both matchers mark the same heuristic headings as used, and
+reports their wall time.
+"""
+import argparse
+import random
+
+from bench_utils import print_table, timed
+
+from src.layout_pipeline import headings_near
+
+
+def nested_loop_near(layout_headings, heuristic_headings, max_dy=20):
+    """The previous O(layout x heuristic) matching, kept as the reference"""
+    used = set()
+    for layout_heading in layout_headings:
+        for i, heuristic_heading in enumerate(heuristic_headings):
+            if (layout_heading['page_num'] == heuristic_heading['page_num'] and
+                    abs(layout_heading['y'] - heuristic_heading['y']) < max_dy):
+                used.add(i)
+    return used
+
+
+def synthetic_headings(count, pages, rng):
+    return [
+        {'page_num': rng.randrange(pages), 'y': rng.uniform(0, 800), 'text': f"heading {i}"}
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 8000])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = []
+    for size in args.sizes:
+        layout = synthetic_headings(size // 2, args.pages, rng)
+        heuristic = synthetic_headings(size, args.pages, rng)
+        expected, old_time = timed(nested_loop_near, layout, heuristic)
+        actual, new_time = timed(headings_near, layout, heuristic, repeat=3)
+        assert actual == expected, "bisect merge disagrees with nested loop"
+        rows.append((len(layout), len(heuristic), f"{old_time * 1000:.1f} ms",
+                     f"{new_time * 1000:.2f} ms", f"{old_time / max(new_time, 1e-9):.0f}x"))
+
+    print_table(("layout", "heuristic", "nested loop", "bisect window", "speed-up"), rows)
+
+
+if __name__ == "__main__":
+    main()
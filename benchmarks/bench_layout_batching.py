@@ -0,0 +1,55 @@
+"""Layout-detection throughput of the render/inference pipeline per batch size
+
+    python benchmarks/bench_layout_batching.py [--batch-sizes 1 2 4 8] [pdf ...]
+
+Needs PaddleOCR and the PP-DocLayout-M model directory; without them it
+prints a note and exits.
+"""
+import argparse
+import os
+import time
+
+from bench_utils import REPO_ROOT, print_table, sample_pdfs
+
+import fitz  # PyMuPDF
+
+from src.layout_pipeline import run_layout_pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--model-dir", default=os.path.join(REPO_ROOT, "models", "PP-DocLayout-M"))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--prefetch", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=3, help="number of sample PDFs")
+    args = parser.parse_args()
+
+    try:
+        from paddleocr import LayoutDetection
+    except ImportError:
+        print("PaddleOCR not installed; skipping the layout batching benchmark")
+        return
+    if not os.path.isdir(args.model_dir):
+        print(f"No layout model in {args.model_dir}; skipping the layout batching benchmark")
+        return
+    model = LayoutDetection(model_name="PP-DocLayout-M", model_dir=args.model_dir, device='cpu')
+
+    docs = [fitz.open(path) for path in sample_pdfs(args.pdfs, limit=args.limit)]
+    total_pages = sum(len(doc) for doc in docs)
+    list(run_layout_pipeline(docs[0], model, page_numbers=[0], batch_size=1))  # warm-up
+
+    rows = []
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        for doc in docs:
+            for _ in run_layout_pipeline(doc, model, batch_size=batch_size, prefetch=args.prefetch):
+                pass
+        elapsed = time.perf_counter() - start
+        rows.append((batch_size, total_pages, f"{elapsed:.2f} s", f"{total_pages / elapsed:.2f}"))
+
+    print_table(("batch size", "pages", "wall time", "pages/s"), rows)
+
+
+if __name__ == "__main__":
+    main()
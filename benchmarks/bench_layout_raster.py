@@ -0,0 +1,87 @@
+"""Per-page layout latency: temp-PNG round trip vs in-memory raster
+
+    python benchmarks/bench_layout_raster.py [--model-dir models/PP-DocLayout-M] [pdf ...]
+
+Without PaddleOCR (or a model directory) only the raster hand-off is timed,
+which is the part this change removes: PNG encode + disk write + fixed sleep.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench_utils import REPO_ROOT, print_table, sample_pdfs
+
+import fitz  # PyMuPDF
+
+from src.layout_pipeline import LAYOUT_DPI, render_page_array
+
+
+def legacy_page(page, predict):
+    """The previous hand-off: PNG temp file, predict on the path, sleep, delete"""
+    pix = page.get_pixmap(dpi=LAYOUT_DPI, alpha=False)
+    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
+        temp_image_path = temp_file.name
+        pix.save(temp_image_path)
+    try:
+        if predict:
+            predict(temp_image_path, batch_size=1)
+    finally:
+        time.sleep(0.1)
+        os.unlink(temp_image_path)
+
+
+def in_memory_page(page, predict):
+    image = render_page_array(page, dpi=LAYOUT_DPI)
+    if predict:
+        predict(image, batch_size=1)
+
+
+def load_predict(model_dir):
+    if not model_dir:
+        return None
+    try:
+        from paddleocr import LayoutDetection
+    except ImportError:
+        print("PaddleOCR not installed; timing the raster hand-off only")
+        return None
+    model = LayoutDetection(model_name="PP-DocLayout-M", model_dir=model_dir, device='cpu')
+    return model.predict
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--model-dir", default=os.path.join(REPO_ROOT, "models", "PP-DocLayout-M"))
+    parser.add_argument("--max-pages", type=int, default=20)
+    args = parser.parse_args()
+
+    predict = load_predict(args.model_dir if os.path.isdir(args.model_dir) else None)
+    pages = []
+    for pdf_path in sample_pdfs(args.pdfs):
+        doc = fitz.open(pdf_path)
+        pages.extend(doc[i] for i in range(len(doc)))
+        if len(pages) >= args.max_pages:
+            break
+    pages = pages[:args.max_pages]
+    if not pages:
+        print("No pages to benchmark")
+        return
+
+    if predict:
+        in_memory_page(pages[0], predict)  # exclude one-time model warm-up
+
+    rows = []
+    for label, fn in (("temp PNG + sleep", legacy_page), ("in-memory array", in_memory_page)):
+        start = time.perf_counter()
+        for page in pages:
+            fn(page, predict)
+        per_page = (time.perf_counter() - start) / len(pages)
+        rows.append((label, len(pages), f"{per_page * 1000:.1f} ms"))
+
+    print(f"Layout hand-off over {len(pages)} pages ({'with' if predict else 'without'} inference)")
+    print_table(("path", "pages", "per page"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Running header/footer collapsing: candidates and encoder inputs saved
+
+    python benchmarks/bench_page_furniture.py [--pages 40] [pdf ...]
+
+Extracts heading candidates from the given PDFs (default: the Challenge_1b
+samples) plus a generated manual-style PDF with a bold running header,
+"Page N of M" footers and a chapter banner on every page, and reports per PDF
+how many candidates and distinct texts remain after
+page_furniture.collapse_repeated_candidates, i.e. the rows no longer scored
+and the encoder inputs no longer computed.
+"""
+import argparse
+import os
+import tempfile
+
+from bench_utils import print_table, sample_pdfs
+
+import fitz  # PyMuPDF
+
+from src.collection_pipeline import extract_pdf_candidates
+from src.page_furniture import collapse_repeated_candidates
+
+
+def manual_pdf(path, pages):
+    """Write a PDF whose pages repeat a header, a chapter banner and a numbered footer"""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 36), "Learn Acrobat - User Guide", fontsize=14, fontname="hebo")
+        page.insert_text((72, 56), f"Chapter {page_num // 5 + 1}", fontsize=12, fontname="hebo")
+        page.insert_text((72, 120), f"Section {page_num + 1}: Topic {page_num * 7 % 23}",
+                         fontsize=16, fontname="hebo")
+        for line in range(20):
+            page.insert_text((72, 150 + 14 * line),
+                             f"Body text line {line} explaining step {page_num}.{line} in detail.",
+                             fontsize=10)
+        page.insert_text((250, 815), f"Page {page_num + 1} of {pages}", fontsize=11,
+                         fontname="hebo")
+    doc.save(path)
+    doc.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--pages", type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generated = os.path.join(tmp, "generated manual.pdf")
+        manual_pdf(generated, args.pages)
+
+        rows = []
+        totals = [0, 0, 0, 0]
+        for pdf_path in [generated] + sample_pdfs(args.pdfs):
+            parsed, candidates = extract_pdf_candidates(pdf_path)
+            kept, stats = collapse_repeated_candidates(candidates, parsed.page_height)
+            texts = len({c["text"] for c in candidates})
+            kept_texts = len({c["text"] for c in kept})
+            rows.append((os.path.basename(pdf_path)[:40], parsed.page_count, len(candidates),
+                         len(kept), texts, kept_texts, stats["groups"]))
+            for i, value in enumerate((len(candidates), len(kept), texts, kept_texts)):
+                totals[i] += value
+
+    print_table(("pdf", "pages", "candidates", "kept", "texts", "texts kept", "running lines"),
+                rows)
+    print(f"\n{totals[0] - totals[1]} of {totals[0]} candidates collapsed, "
+          f"{totals[2] - totals[3]} of {totals[2]} per-PDF encoder inputs avoided")
+
+
+if __name__ == "__main__":
+    main()
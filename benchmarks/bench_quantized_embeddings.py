@@ -0,0 +1,174 @@
+"""Compressed corpus embeddings vs float32: RAM, query latency and top-k agreement
+
+    python benchmarks/bench_quantized_embeddings.py [--sizes 10000 100000] [--top-k 5]
+    python benchmarks/bench_quantized_embeddings.py --samples [--config config.json]
+
+The default mode builds synthetic clustered 384-d embeddings (the
+e5-small-v2 width) split into documents of ~50 headings and, for float16 and
+int8 storage, reports the store's in-RAM bytes, mean per-query time of the
+approximate scan plus exact re-score against exact per-document scoring, the
+share of rows re-scored, and how many per-document top-k lists differ from
+exact. Process RSS is measured in a fresh interpreter per storage mode that
+keeps only that form of the corpus and answers the queries; it is split into
+private memory and file-backed pages (the memory-mapped float32 rows read
+back for re-scoring, which the OS can evict).
+
+--samples encodes the heading candidates of the Challenge_1b collections with
+the real encoder and checks every configured job query ranks the same.
+"""
+import argparse
+import gc
+import glob
+import os
+import subprocess
+import sys
+import time
+
+from bench_utils import SAMPLE_ROOT, print_table
+
+import numpy as np
+
+from src.quantized_embeddings import QuantizedEmbeddings, process_rss_bytes
+from src.semantic_matcher import cosine_scores
+
+
+def synthetic_corpus(size, dim, doc_size, rng):
+    centers = rng.standard_normal((max(8, size // 500), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size)
+    vectors = (centers[labels] + 0.6 * rng.standard_normal((size, dim))).astype(np.float32)
+    docs = {f"doc{i}": vectors[start:start + doc_size]
+            for i, start in enumerate(range(0, size, doc_size))}
+    return docs, centers
+
+
+def exact_top_k(embeddings_by_doc, query, k):
+    results = {}
+    for doc, embeddings in embeddings_by_doc.items():
+        scores = cosine_scores(query, embeddings)
+        results[doc] = np.argsort(-scores, kind="stable")[:k].tolist()
+    return results
+
+
+def quantized_top_k(store, query, k):
+    results = {}
+    for doc, (rows, scores) in store.shortlist_scores(query, k).items():
+        order = np.argsort(-scores, kind="stable")[:k]
+        results[doc] = rows[order].tolist()
+    return results
+
+
+def resident_memory(args, size, dtype):
+    """(private, file-backed) MiB of a fresh process serving the corpus stored as dtype"""
+    command = [sys.executable, os.path.abspath(__file__), "--rss-child", dtype,
+               "--sizes", str(size), "--queries", str(args.queries), "--top-k", str(args.top_k),
+               "--dim", str(args.dim), "--doc-size", str(args.doc_size), "--seed", str(args.seed)]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return [float(value) for value in output.split()[-2:]]
+
+
+def rss_child(args):
+    """Build one storage mode, drop everything else, answer the queries, print RSS"""
+    rng = np.random.default_rng(args.seed)
+    docs, queries = synthetic_workload(args.sizes[0], args, rng)
+    if args.rss_child == "float32":
+        for query in queries:
+            exact_top_k(docs, query, args.top_k)
+    else:
+        store = QuantizedEmbeddings(docs, args.rss_child)
+        del docs
+        gc.collect()
+        for query in queries:
+            quantized_top_k(store, query, args.top_k)
+    rss, file_backed = process_rss_bytes()
+    print(f"{(rss - file_backed) / 2**20:.1f} {file_backed / 2**20:.1f}")
+
+
+def synthetic_workload(size, args, rng):
+    docs, centers = synthetic_corpus(size, args.dim, args.doc_size, rng)
+    queries = (centers[rng.integers(0, len(centers), args.queries)]
+               + 0.6 * rng.standard_normal((args.queries, args.dim))).astype(np.float32)
+    return docs, list(queries)
+
+
+def compare(embeddings_by_doc, queries, k, dtypes):
+    """Return one table row per storage mode, float32 first"""
+    start = time.perf_counter()
+    exact = [exact_top_k(embeddings_by_doc, query, k) for query in queries]
+    exact_time = (time.perf_counter() - start) / len(queries)
+    float32_bytes = sum(e.nbytes for e in embeddings_by_doc.values())
+    rows = [("float32", f"{float32_bytes / 2**20:.1f} MiB", f"{exact_time * 1000:.2f} ms",
+             "100%", 0)]
+
+    for dtype in dtypes:
+        store = QuantizedEmbeddings(embeddings_by_doc, dtype)
+        rescored = 0
+        start = time.perf_counter()
+        results = [quantized_top_k(store, query, k) for query in queries]
+        query_time = (time.perf_counter() - start) / len(queries)
+        for query in queries[:20]:
+            rescored += sum(len(r) for r, _ in store.shortlist_scores(query, k).values())
+        mismatches = sum(got[doc] != want[doc]
+                         for got, want in zip(results, exact) for doc in want)
+        rows.append((dtype, f"{store.nbytes / 2**20:.1f} MiB", f"{query_time * 1000:.2f} ms",
+                     f"{100 * rescored / (min(20, len(queries)) * len(store)):.1f}%",
+                     mismatches))
+        store.close()
+    return rows
+
+
+def sample_collections(config_path, k, dtypes):
+    from extract1btent import load_config
+    from src.collection_pipeline import embed_collection, load_collection
+    from src.model_registry import get_model
+    from src.semantic_matcher import encode_texts
+
+    config = load_config(config_path)
+    encoder = get_model()
+    for name, settings in config["collections"].items():
+        pdf_paths = sorted(glob.glob(os.path.join(SAMPLE_ROOT, name, "PDFs", "*.pdf")))
+        if not pdf_paths:
+            continue
+        collection = load_collection(pdf_paths)
+        embed_collection(collection, encoder)
+        query = encode_texts([settings["job_query"]], encoder)[0]
+        print(f"\n{name}: {sum(map(len, collection.embeddings_by_pdf.values()))} candidates")
+        print_table(("storage", "RAM", "per query", "re-scored", "top-k mismatches"),
+                    compare(collection.embeddings_by_pdf, [query], k, dtypes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--doc-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dtypes", nargs="+", default=["float16", "int8"])
+    parser.add_argument("--samples", action="store_true",
+                        help="check the Challenge_1b collections with the real encoder")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--rss-child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_child:
+        rss_child(args)
+        return
+    if args.samples:
+        sample_collections(args.config, args.top_k, args.dtypes)
+        return
+
+    for size in args.sizes:
+        # Each size gets its own seed so the RSS children can rebuild the same corpus
+        docs, queries = synthetic_workload(size, args, np.random.default_rng(args.seed))
+        print(f"\n{size} vectors in {len(docs)} documents, top-{args.top_k} per document")
+        rows = compare(docs, queries, args.top_k, args.dtypes)
+        del docs
+        rows = [row + tuple(f"{mib:.0f} MiB" for mib in resident_memory(args, size, row[0]))
+                for row in rows]
+        print_table(("storage", "RAM", "per query", "re-scored", "top-k mismatches",
+                     "RSS private", "RSS file-backed"), rows)
+
+
+if __name__ == "__main__":
+    main()
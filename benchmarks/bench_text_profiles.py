@@ -0,0 +1,76 @@
+"""Per-page get_text("dict") cost for each text extraction profile
+
+    python benchmarks/bench_text_profiles.py [--repeat 3] [pdf ...]
+
+Parses every page of the Challenge_1b sample PDFs (or the PDFs given) with
+each profile in TEXT_PROFILES, checks the profiles yield the same text lines,
+and reports mean parse time and peak allocation per page plus the number of
+image blocks that were decoded.
+"""
+import argparse
+import time
+import tracemalloc
+
+from bench_utils import print_table, sample_pdfs
+
+import fitz  # PyMuPDF
+
+from src.document_model import TEXT_PROFILES
+
+
+def page_lines(page_dict):
+    return [
+        "".join(span["text"] for span in line["spans"])
+        for block in page_dict["blocks"]
+        for line in block.get("lines", [])
+    ]
+
+
+def profile_page(page, flags, repeat):
+    """Return (best seconds, peak bytes, image blocks, text lines) for one page"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page.get_text("dict", flags=flags)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    page_dict = page.get_text("dict", flags=flags)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    images = sum(1 for block in page_dict["blocks"] if block.get("type") == 1)
+    return best, peak, images, page_lines(page_dict)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    totals = {name: [0.0, 0, 0] for name in TEXT_PROFILES}
+    pages = 0
+    for pdf_path in sample_pdfs(args.pdfs):
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                pages += 1
+                reference = None
+                for name, flags in TEXT_PROFILES.items():
+                    seconds, peak, images, lines = profile_page(page, flags, args.repeat)
+                    if reference is None:
+                        reference = lines
+                    assert lines == reference, f"{name} changes the text of {pdf_path} p{page.number}"
+                    totals[name][0] += seconds
+                    totals[name][1] += peak
+                    totals[name][2] += images
+
+    rows = [
+        (name, pages, f"{seconds / max(pages, 1) * 1000:.2f} ms",
+         f"{peak / max(pages, 1) / 1024:.0f} KiB", images)
+        for name, (seconds, peak, images) in totals.items()
+    ]
+    print_table(("profile", "pages", "parse / page", "peak memory / page", "image blocks"), rows)
+
+
+if __name__ == "__main__":
+    main()
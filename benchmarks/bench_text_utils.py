@@ -0,0 +1,97 @@
+"""clean_text / is_binary_data micro-benchmark over real spans
+
+    python benchmarks/bench_text_utils.py [--repeat 5] [pdf ...]
+
+Collects every span text from the Challenge_1b sample PDFs (or the PDFs given),
+checks the current implementation returns exactly what the previous one did,
+and times both. The previous implementation is reproduced below as reference.
+"""
+import argparse
+import re
+
+from bench_utils import print_table, sample_pdfs, timed
+
+from src import text_utils
+
+
+def reference_is_binary_data(text):
+    if not isinstance(text, str):
+        return True
+    printable_chars = sum(1 for c in text if c.isprintable() or c.isspace())
+    if len(text) > 0 and printable_chars / len(text) < 0.7:
+        return True
+    if '\x00' in text or len([c for c in text if ord(c) < 32 and c not in '\n\r\t']) > len(text) * 0.1:
+        return True
+    return False
+
+
+def reference_clean_text(text, max_words=150):
+    if not isinstance(text, str):
+        return ""
+    if reference_is_binary_data(text):
+        return ""
+    cleaned = ''.join(char for char in text if char.isprintable() or char in '\n\r\t ')
+    cleaned = cleaned.replace('\t', ' ')
+    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    if reference_is_binary_data(cleaned):
+        return ""
+    words = cleaned.split()
+    if len(words) <= max_words:
+        return cleaned.strip()
+    prefix = words[:max_words]
+    collected = []
+    for word in words[max_words:]:
+        collected.append(word)
+        if word.endswith('.'):
+            return " ".join(prefix + collected).strip()
+    return " ".join(prefix + collected).strip() + " ..."
+
+
+def collect_spans(pdf_paths):
+    import fitz  # PyMuPDF
+
+    spans = []
+    for pdf_path in pdf_paths:
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                for block in page.get_text("dict")["blocks"]:
+                    for line in block.get("lines", []):
+                        spans.extend(span["text"] for span in line["spans"])
+    return spans
+
+
+def run_all(fn, spans):
+    return [fn(span) for span in spans]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    spans = collect_spans(sample_pdfs(args.pdfs))
+    print(f"{len(spans)} spans, {len(set(spans))} distinct")
+
+    assert run_all(reference_clean_text, spans) == run_all(text_utils.clean_text, spans)
+    assert run_all(reference_is_binary_data, spans) == run_all(text_utils.is_binary_data, spans)
+
+    rows = []
+    for name, old_fn, new_fn in (
+        ("is_binary_data", reference_is_binary_data, text_utils.is_binary_data),
+        ("clean_text", reference_clean_text, text_utils.clean_text),
+    ):
+        _, old_time = timed(run_all, old_fn, spans, repeat=args.repeat)
+        text_utils._clean_text_cached.cache_clear()
+        _, cold_time = timed(run_all, new_fn, spans)
+        _, warm_time = timed(run_all, new_fn, spans, repeat=args.repeat)
+        per_span = 1e6 / len(spans)
+        rows.append((name, f"{old_time * per_span:.2f} us", f"{cold_time * per_span:.2f} us",
+                     f"{warm_time * per_span:.2f} us", f"{old_time / max(warm_time, 1e-9):.1f}x"))
+
+    print_table(("function", "previous", "current (cold)", "current (warm)", "speed-up"), rows)
+    print(f"clean_text cache: {text_utils._clean_text_cached.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Shared helpers for the scripts in benchmarks/"""
+import glob
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+SAMPLE_ROOT = os.path.join(REPO_ROOT, "Challenge_1b")
+
+
+def sample_pdfs(paths=None, limit=None):
+    """Return the PDFs given on the command line, or every Challenge_1b sample PDF"""
+    if paths:
+        pdfs = list(paths)
+    else:
+        pdfs = sorted(glob.glob(os.path.join(SAMPLE_ROOT, "Collection *", "PDFs", "*.pdf")))
+    return pdfs[:limit] if limit else pdfs
+
+
+def timed(fn, *args, repeat=1, **kwargs):
+    """Run fn repeat times and return (last result, best wall time in seconds)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def print_table(headers, rows):
+    """Print rows as a plain fixed-width table"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) if rows else len(str(h))
+              for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
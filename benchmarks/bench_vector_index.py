@@ -0,0 +1,85 @@
+"""IVF index vs exact cosine top-k: recall and per-query latency
+
+    python benchmarks/bench_vector_index.py [--sizes 10000 50000 100000] [--probes 4 8 16 32]
+
+Builds synthetic clustered 384-d embeddings (the e5-small-v2 width) split
+into documents of ~50 headings, trains the index, and for each n_probe
+reports recall@k against brute-force cosine scoring plus mean query time.
+Also times removing and re-adding a document.
+"""
+import argparse
+import time
+
+from bench_utils import print_table, timed
+
+import numpy as np
+
+from src.semantic_matcher import cosine_score_matrix
+from src.vector_index import IVFIndex
+
+
+def synthetic_corpus(size, dim, topics, rng):
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, size)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((size, dim)).astype(np.float32)
+    return vectors.astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--probes", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--doc-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    rows = []
+    for size in args.sizes:
+        vectors = synthetic_corpus(size, args.dim, max(8, size // 500), rng)
+        queries = synthetic_corpus(args.queries, args.dim, max(8, size // 500), rng)
+
+        index = IVFIndex()
+        docs = {}
+        for doc_num, start in enumerate(range(0, size, args.doc_size)):
+            docs[f"doc{doc_num}"] = vectors[start:start + args.doc_size]
+            index.add(f"doc{doc_num}", docs[f"doc{doc_num}"])
+        _, train_time = timed(index.train)
+
+        row_of = {}
+        for doc_num, start in enumerate(range(0, size, args.doc_size)):
+            for row in range(min(args.doc_size, size - start)):
+                row_of[(f"doc{doc_num}", row)] = start + row
+
+        start = time.perf_counter()
+        exact_scores = cosine_score_matrix(queries, vectors)
+        exact = [set(np.argsort(-scores, kind="stable")[:args.k].tolist())
+                 for scores in exact_scores]
+        exact_time = (time.perf_counter() - start) / args.queries
+
+        for n_probe in args.probes:
+            start = time.perf_counter()
+            results = [index.search(query, k=args.k, n_probe=n_probe) for query in queries]
+            ann_time = (time.perf_counter() - start) / args.queries
+            recall = np.mean([
+                len({row_of[(doc, row)] for _, doc, row in hits} & truth) / len(truth)
+                for hits, truth in zip(results, exact)
+            ])
+            rows.append((size, index.n_lists, n_probe, f"{recall:.3f}",
+                         f"{exact_time * 1000:.2f} ms", f"{ann_time * 1000:.2f} ms",
+                         f"{train_time:.1f} s"))
+
+        _, remove_time = timed(index.remove, "doc0")
+        _, add_time = timed(index.add, "doc0", docs["doc0"])
+        print(f"{size} vectors: remove doc {remove_time * 1000:.2f} ms, "
+              f"add doc {add_time * 1000:.2f} ms")
+
+    print_table(("vectors", "lists", "n_probe", f"recall@{args.k}", "exact / query",
+                 "ivf / query", "train"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Sample outputs: current pipeline vs the shipped challenge1b_output.json files
+
+    python benchmarks/check_sample_outputs.py [--config config.json] [--runs 2] [collection ...]
+
+Runs process_collection on each Challenge_1b sample collection with the
+configured performance_settings, caches redirected to a temporary folder so
+the first run is cold and later runs are warm, and compares every output
+with the challenge1b_output.json shipped next to the PDFs (the processing
+timestamp aside). Needs the real encoder; exits 1 if any ranking, section
+or text differs, so caching and batching changes can be checked against
+the original results.
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import tempfile
+
+from bench_utils import REPO_ROOT, SAMPLE_ROOT, print_table
+
+import extract1btent
+
+
+def first_difference(output, expected):
+    """Describe the first field where output differs from expected, or return None"""
+    for field in ("metadata", "extracted_sections", "subsection_analysis"):
+        got, want = output.get(field), expected.get(field)
+        if field == "metadata":
+            got = {k: v for k, v in (got or {}).items() if k != "processing_timestamp"}
+            want = {k: v for k, v in (want or {}).items() if k != "processing_timestamp"}
+            if got != want:
+                return f"metadata: {sorted(k for k in want if got.get(k) != want[k])}"
+            continue
+        for rank, (a, b) in enumerate(zip(got, want), 1):
+            if a != b:
+                keys = [k for k in b if a.get(k) != b[k]]
+                return (f"{field} #{rank} {keys}: {a['document']} p{a['page_number']} "
+                        f"vs {b['document']} p{b['page_number']}")
+        if len(got) != len(want):
+            return f"{field}: {len(got)} entries vs {len(want)}"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("collections", nargs="*")
+    parser.add_argument("--config", default=os.path.join(REPO_ROOT, "config.json"))
+    parser.add_argument("--runs", type=int, default=2,
+                        help="runs per collection; runs after the first hit the caches")
+    args = parser.parse_args()
+
+    config = extract1btent.load_config(args.config)
+    names = args.collections or list(config["collections"])
+    rows = []
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        config = copy.deepcopy(config)
+        config["output_settings"]["output_folder"] = os.path.join(tmp, "output")
+        perf_settings = config.setdefault("performance_settings", {})
+        for key in ("embedding_cache_path", "artifact_cache_path"):
+            if perf_settings.get(key):
+                perf_settings[key] = os.path.join(tmp, os.path.basename(perf_settings[key]))
+
+        for name in names:
+            sample_dir = os.path.join(SAMPLE_ROOT, name)
+            config["collections"][name]["input_folder"] = os.path.join(sample_dir, "PDFs")
+            with open(os.path.join(sample_dir, "challenge1b_output.json"), encoding="utf-8") as f:
+                expected = json.load(f)
+            for run in range(1, args.runs + 1):
+                extract1btent.process_collection(name, config)
+                output_path = os.path.join(config["output_settings"]["output_folder"],
+                                           "challenge1b_output.json")
+                with open(output_path, encoding="utf-8") as f:
+                    difference = first_difference(json.load(f), expected)
+                failed = failed or difference is not None
+                rows.append((name, run, "same" if difference is None else difference))
+
+    print()
+    print_table(("collection", "run", "vs shipped output"), rows)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -81,6 +81,25 @@ def initialize_paddleocr():
         print(f"Warning: PaddleOCR initialization failed: {e}")
         print("This is not critical - the system will work without layout detection")
 
+def export_onnx_encoder():
+    """Export the sentence model to ONNX (float32 and int8) for the onnx encoder backend"""
+    print("\n=== Exporting sentence-transformers model to ONNX ===")
+
+    try:
+        from src.model_registry import DEFAULT_ONNX_DIR, get_model
+        from src.onnx_encoder import ONNXRUNTIME_AVAILABLE
+        if not ONNXRUNTIME_AVAILABLE:
+            print("onnxruntime not available - this is optional")
+            return
+        # Exports into /app/models/onnx on first load, then runs a test encode
+        model = get_model(backend="onnx", quantize=True)
+        embedding = model.encode("This is a test sentence.")
+        print(f"✓ ONNX encoder test successful. Embedding shape: {embedding.shape}")
+        print(f"✓ ONNX model exported to: {DEFAULT_ONNX_DIR}")
+    except Exception as e:
+        print(f"Warning: ONNX export failed: {e}")
+        print("This is not critical - the torch encoder will be used")
+
 def download_models():
     """Download and initialize all required models"""
     print("========================================")
@@ -88,6 +107,7 @@ def download_models():
     print("========================================")
     
     download_sentence_transformers()
+    export_onnx_encoder()
     #initialize_paddleocr()
     
     print("\n========================================")
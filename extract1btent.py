@@ -7,8 +7,12 @@ import sys
 from collections import Counter
 
 # Import from our new src modules
-from src.heading_extractor import extract_heading_candidates, extract_sections_from_headings
-from src.semantic_matcher import match_to_job_query
+from src.artifact_cache import ArtifactCache
+from src.collection_pipeline import collection_sections, embed_collection, load_collection
+from src.document_model import DEFAULT_TEXT_PROFILE
+from src.semantic_matcher import DEFAULT_TOKEN_BUDGET, encode_stats, match_collection_to_job_query
+from src.model_registry import get_model, warm_up
+from src.embedding_cache import EmbeddingCache
 from src.text_utils import clean_text
 from src.round1b_formatter import Round1BFormatter
 
@@ -26,6 +30,95 @@ def load_config(config_path="config.json"):
         sys.exit(1)
 
 
+def open_embedding_cache(config):
+    """Open the persistent embedding cache configured in performance_settings, if any"""
+    perf_settings = config.get("performance_settings", {})
+    cache_path = perf_settings.get("embedding_cache_path")
+    if not cache_path:
+        return None
+    return EmbeddingCache(cache_path, max_mb=perf_settings.get("embedding_cache_max_mb", 256))
+
+
+def open_artifact_cache(config):
+    """Open the per-PDF artifact cache; without artifact_cache_path it is in-memory only"""
+    perf_settings = config.get("performance_settings", {})
+    return ArtifactCache(perf_settings.get("artifact_cache_path"),
+                         max_mb=perf_settings.get("artifact_cache_max_mb", 512))
+
+
+def encoder_settings(config):
+    """Encoder backend options for get_model / warm_up from performance_settings"""
+    perf_settings = config.get("performance_settings", {})
+    return {"backend": perf_settings.get("encoder_backend", "torch"),
+            "quantize": perf_settings.get("onnx_quantize", True),
+            "threads": perf_settings.get("encoder_threads") or None,
+            "onnx_dir": perf_settings.get("onnx_model_dir"),
+            "max_seq_length": perf_settings.get("encode_max_seq_length")}
+
+
+def print_encode_stats(reset=True):
+    """Print how much the encoder did since the last call, if anything"""
+    stats = encode_stats(reset=reset)
+    if not stats["texts"]:
+        return
+    padding = 1 - stats["tokens"] / max(stats["padded_tokens"], 1)
+    print(f"Encoder: {stats['texts']} texts, {stats['tokens']} tokens in {stats['batches']} "
+          f"batches, {stats['tokens_per_second']:.0f} tokens/s ({padding:.0%} padding)")
+
+
+# Request fields that must be strings when given
+QUERY_TEXT_FIELDS = ("collection", "input_folder", "persona", "job_to_be_done", "job_query")
+
+
+def _positive_int(value, key):
+    """Parse a top-k request field, raising ValueError unless it is an integer >= 1"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Request field '{key}' must be a positive integer")
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"Request field '{key}' must be a positive integer") from None
+    if number < 1:
+        raise ValueError(f"Request field '{key}' must be a positive integer")
+    return number
+
+
+def resolve_query(config, request):
+    """Merge a query request with the defaults of the collection it names, if any
+
+    A request gives either "collection" (a key of config["collections"]) or an
+    explicit "input_folder"; any field it sets overrides the collection's.
+    top_k_matches and top_k_output come back as ints, defaulting to
+    output_settings. Raises ValueError for an unknown collection, missing
+    fields or fields of the wrong type.
+    """
+    for key in QUERY_TEXT_FIELDS:
+        if request.get(key) is not None and not isinstance(request[key], str):
+            raise ValueError(f"Request field '{key}' must be a string")
+
+    resolved = {}
+    name = request.get("collection")
+    if name is not None:
+        if name not in config["collections"]:
+            raise ValueError(f"Collection '{name}' not found in configuration")
+        resolved.update(config["collections"][name])
+    resolved.update({k: v for k, v in request.items() if v is not None})
+
+    missing = [key for key in ("input_folder", "persona", "job_to_be_done", "job_query")
+               if not resolved.get(key)]
+    if missing:
+        raise ValueError(f"Missing request fields: {', '.join(missing)}")
+
+    output_settings = config["output_settings"]
+    resolved["top_k_matches"] = _positive_int(
+        resolved.get("top_k_matches", output_settings["top_k_matches"]), "top_k_matches"
+    )
+    resolved["top_k_output"] = _positive_int(
+        resolved.get("top_k_output", output_settings.get("top_k_output", 20)), "top_k_output"
+    )
+    return resolved
+
+
 def process_collection(collection_name, config):
     """Process a specific collection"""
     if collection_name not in config["collections"]:
@@ -35,6 +128,7 @@ def process_collection(collection_name, config):
     
     collection_config = config["collections"][collection_name]
     output_settings = config["output_settings"]
+    perf_settings = config.get("performance_settings", {})
     
     input_folder = collection_config["input_folder"]
     output_folder = output_settings["output_folder"]
@@ -47,7 +141,8 @@ def process_collection(collection_name, config):
     print(f"{'='*60}")
 
     os.makedirs(output_folder, exist_ok=True)
-    pdf_paths = glob.glob(os.path.join(input_folder, "*.pdf"))
+    # Sorted so input_documents and tie-breaking in the ranking are deterministic
+    pdf_paths = sorted(glob.glob(os.path.join(input_folder, "*.pdf")))
     
     if not pdf_paths:
         print(f"No PDF files found in {input_folder}")
@@ -62,65 +157,79 @@ def process_collection(collection_name, config):
     top_k_output = output_settings.get("top_k_output", 20)  # Default to 20 if not specified
 
     # Initialize Round 1B formatter with top_k limit
-    formatter = Round1BFormatter(input_documents, persona, job_to_be_done, top_k=top_k_output)
+    formatter = Round1BFormatter(input_documents, persona, job_to_be_done, top_k=top_k_output,
+                                 bounded=perf_settings.get("bounded_output", False))
 
     print(f"Found {len(pdf_paths)} PDF files to process")
+
+    # Load the encoder once for the whole collection (no-op if already warm)
+    encoder = get_model(**encoder_settings(config))
+    embedding_cache = open_embedding_cache(config)
+    artifact_cache = open_artifact_cache(config)
     # print(f"Will extract top {top_k_matches} matches per PDF")
     # print(f"Final output limited to top {top_k_output} sections overall")
 
-    for pdf_path in pdf_paths:
+    # Stage 1: parse each PDF once and extract heading candidates
+    # (in a process pool when performance_settings.parallel_workers > 1);
+    # unchanged PDFs, or ones already seen in another collection, come from the artifact cache
+    workers = perf_settings.get("parallel_workers", 1)
+    profile = perf_settings.get("text_extraction_profile", DEFAULT_TEXT_PROFILE)
+    collapse_furniture = perf_settings.get("collapse_page_furniture", False)
+    collection = load_collection(pdf_paths, workers, profile, artifact_cache=artifact_cache,
+                                 collapse_furniture=collapse_furniture)
+
+    # Stage 2: encode the whole collection in one batched pass and rank per PDF
+    # (candidate embeddings of unchanged PDFs are reused from the artifact cache)
+    try:
+        token_budget = perf_settings.get("encode_token_budget", DEFAULT_TOKEN_BUDGET)
+        embed_collection(collection, encoder, embedding_cache=embedding_cache,
+                         artifact_cache=artifact_cache,
+                         batch_size=perf_settings.get("encode_batch_size", 64),
+                         token_budget=token_budget)
+        matches_by_pdf = match_collection_to_job_query(
+            collection.candidates_by_pdf, job_query, top_k=top_k_matches, model=encoder,
+            embedding_cache=embedding_cache, candidate_embeddings=collection.embeddings_by_pdf
+        )
+    except Exception as e:
+        print(f"Error matching collection against job query: {str(e)}")
+        matches_by_pdf = {}
+
+    # Stage 3: slice the matched sections out of each PDF
+    for pdf_path, sections, error in collection_sections(collection, matches_by_pdf):
         pdf_name = os.path.basename(pdf_path)
-        print(f"\nProcessing: {pdf_name}")
-        
-        try:
-            candidates = extract_heading_candidates(pdf_path)
-            print(f"Found {len(candidates)} heading candidates.")
-
-            if not candidates:
-                print(f"No candidates found in {pdf_name}, skipping...")
-                continue
-            
-            top_matches = match_to_job_query(candidates, job_query, top_k=top_k_matches)
-            # print(f"Top {len(top_matches)} Matching Headings:")
-            # for idx, match in enumerate(top_matches):
-            #     print(f"{idx+1}. {match['text']} (Score: {match['score']}) [Page: {match['page_num']+1}]")
-
-            if not top_matches:
-                print(f"No matching sections found in {pdf_name}, skipping...")
-                continue
-
-            sections = extract_sections_from_headings(pdf_path, top_matches)
-
-            # Add to Round 1B formatter
-            formatter.add_pdf_results(pdf_name, sections)
-
-            # Prepare individual results if enabled
-            if output_settings["save_individual_results"]:
-                out_data = []
-                for section in sections:
-                    out_data.append({
-                        "heading": section["heading"],
-                        "score": section["score"],
-                        "content": section["content"],
-                        "page_number": section.get("page_number", 1)
-                    })
-                    # print(f"\n### {section['heading']} (Score: {section['score']}) [Page: {section.get('page_number', 1)}]")
-                    # print(section["content"][:500] + "..." if len(section["content"]) > 500 else section["content"])
-
-                # Save individual results
-                out_json_path = os.path.join(
-                    output_folder,
-                    os.path.basename(pdf_path).replace('.pdf', '_results.json')
-                )
-                with open(out_json_path, "w", encoding="utf-8") as f:
-                    json.dump(out_data, f, ensure_ascii=False, indent=2)
-                print(f"Individual results saved to {out_json_path}")
-            else:
-                print(f"Processed {len(sections)} sections from {pdf_name}")
-                
-        except Exception as e:
-            print(f"Error processing {pdf_name}: {str(e)}")
+
+        if error is not None:
+            print(f"Error processing {pdf_name}: {error}")
+            continue
+
+        if not sections:
+            print(f"No matching sections found in {pdf_name}, skipping...")
             continue
+
+        # Add to Round 1B formatter
+        formatter.add_pdf_results(pdf_name, sections)
+
+        # Prepare individual results if enabled
+        if output_settings["save_individual_results"]:
+            out_data = []
+            for section in sections:
+                out_data.append({
+                    "heading": section["heading"],
+                    "score": section["score"],
+                    "content": section["content"],
+                    "page_number": section.get("page_number", 1)
+                })
+
+            # Save individual results
+            out_json_path = os.path.join(
+                output_folder,
+                os.path.basename(pdf_path).replace('.pdf', '_results.json')
+            )
+            with open(out_json_path, "w", encoding="utf-8") as f:
+                json.dump(out_data, f, ensure_ascii=False, indent=2)
+            print(f"Individual results saved to {out_json_path}")
+        else:
+            print(f"Processed {len(sections)} sections from {pdf_name}")
     
     # Generate Round 1B output after processing all PDFs
     print("\n" + "="*50)
@@ -128,9 +237,19 @@ def process_collection(collection_name, config):
     try:
         output_path = formatter.save_round1b_output(output_folder)
         print(f"✓ Round 1B output saved to: {output_path}")
-        print(f"✓ Limited to top {top_k_output} sections from {len(formatter.all_sections)} total found")
+        print(f"✓ Limited to top {top_k_output} sections from {formatter.total_sections} total found")
     except Exception as e:
         print(f"Error generating Round 1B output: {str(e)}")
+    if embedding_cache is not None:
+        cache_stats = embedding_cache.stats()
+        print(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['hit_rate']:.0%} hit rate)")
+        embedding_cache.close()
+    artifact_stats = artifact_cache.stats()
+    print(f"Artifact cache: {artifact_stats['memory_hits']} in-memory hits, "
+          f"{artifact_stats['disk_hits']} disk hits, {artifact_stats['misses']} misses")
+    artifact_cache.close()
+    print_encode_stats()
     print("="*50)
 
 
@@ -157,5 +276,6 @@ if __name__ == "__main__":
         print("Operation cancelled.")
         exit()
     
+    warm_up(**encoder_settings(config))
     process_collection(collection_to_process, config)
 
@@ -0,0 +1,289 @@
+"""Long-lived local query service for Round 1B
+
+    python query_server.py [--config config.json] [--port 8765] [--preload all]
+
+Loads the encoder once and keeps every parsed collection (PDFs, heading
+candidates and their embeddings) in memory, so a request only pays for
+encoding the query, ranking and slicing sections. With
+performance_settings.ann_shortlist > 0 each collection also gets an in-process
+IVF index (src/vector_index.py) that shortlists candidates across the corpus
+before the exact per-document ranking. With performance_settings.embedding_storage
+set to "int8" or "float16", candidate embeddings are held compressed in RAM
+(src/quantized_embeddings.py) and only a shortlist is re-scored exactly.
+Folders load under their own locks while other folders keep answering, and
+a folder whose PDFs changed is reloaded on its next request.
+
+    GET  /health   -> {"status": "ok", "collections": [...loaded input folders]}
+    POST /query    -> Round 1B output JSON
+
+The /query body names either a configured "collection" (its persona,
+job_to_be_done and job_query are the defaults) or an "input_folder" of PDFs,
+and may override "persona", "job_to_be_done", "job_query", "top_k_matches"
+and "top_k_output". Text fields must be strings and the top-k fields positive
+integers; a malformed request gets a 400 with an "error" message.
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from extract1btent import (encoder_settings, load_config, open_artifact_cache, open_embedding_cache,
+                           print_encode_stats, resolve_query)
+from src.artifact_cache import content_hash
+from src.collection_pipeline import collection_sections, embed_collection, load_collection
+from src.document_model import DEFAULT_TEXT_PROFILE
+from src.model_registry import warm_up
+from src.round1b_formatter import Round1BFormatter
+from src.quantized_embeddings import STORAGE_DTYPES, QuantizedEmbeddings, process_rss_bytes
+from src.semantic_matcher import (DEFAULT_TOKEN_BUDGET, match_collection_quantized,
+                                  match_collection_to_job_query, match_collection_with_index)
+from src.vector_index import build_index
+
+
+class SerializedEncoder:
+    """Encoder proxy that lets one thread at a time into the model and its tokenizer
+
+    The lock is taken per call, and collection loading encodes batch by batch,
+    so a query on a loaded folder waits for at most one batch of a folder
+    being loaded, not for the whole folder.
+    """
+
+    _LOCKED = ("encode", "tokenize", "token_lengths")
+
+    def __init__(self, encoder):
+        self._encoder = encoder
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._encoder, name)
+        if name not in self._LOCKED:
+            return attr
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+        return locked
+
+
+class QueryService:
+    """Keeps the encoder warm and parsed collections in memory between requests
+
+    Each folder is loaded under its own lock, so loading a new folder does not
+    hold up queries on folders already in memory; only encoder calls are
+    serialised (SerializedEncoder). Every request re-checks the folder's PDFs
+    by content hash and reloads the folder if they changed.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.perf_settings = config.get("performance_settings", {})
+        self.output_settings = config["output_settings"]
+        self.encoder = SerializedEncoder(warm_up(**encoder_settings(config)))
+        self.embedding_cache = open_embedding_cache(config)
+        self.artifact_cache = open_artifact_cache(config)
+        self.collections = {}
+        # Optional ANN index per collection, used when performance_settings.ann_shortlist > 0
+        self.ann_shortlist = self.perf_settings.get("ann_shortlist", 0)
+        # Compressed corpus embeddings per collection, unless embedding_storage is "float32"
+        self.embedding_storage = self.perf_settings.get("embedding_storage", "float32")
+        if self.embedding_storage not in STORAGE_DTYPES:
+            raise ValueError(f"embedding_storage must be one of {', '.join(STORAGE_DTYPES)}")
+        if self.ann_shortlist > 0 and self.embedding_storage != "float32":
+            # The IVF index keeps its own float32 copy and would bypass the compressed store
+            raise ValueError("ann_shortlist and a compressed embedding_storage cannot be combined")
+        # {input folder: (PDF fingerprint, collection, index or None, store or None)}
+        self._loaded = {}
+        self._folder_locks = {}
+        # Guards _loaded, _folder_locks and collections; held only for dict updates
+        self._state_lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(pdf_paths):
+        # content_hash is memoised per (path, size, mtime), so unchanged files are not re-read
+        return tuple((os.path.basename(pdf_path), content_hash(pdf_path))
+                     for pdf_path in pdf_paths)
+
+    def _load(self, input_folder):
+        """Return (collection, index, store) for a folder, (re)loading it if its PDFs changed"""
+        pdf_paths = sorted(glob.glob(os.path.join(input_folder, "*.pdf")))
+        if not pdf_paths:
+            raise ValueError(f"No PDF files found in {input_folder}")
+        fingerprint = self._fingerprint(pdf_paths)
+        with self._state_lock:
+            loaded = self._loaded.get(input_folder)
+            folder_lock = self._folder_locks.setdefault(input_folder, threading.Lock())
+        if loaded is not None and loaded[0] == fingerprint:
+            return loaded[1:]
+
+        with folder_lock:
+            # Another request may have loaded the folder while this one waited
+            with self._state_lock:
+                loaded = self._loaded.get(input_folder)
+            if loaded is not None and loaded[0] == fingerprint:
+                return loaded[1:]
+            if loaded is not None:
+                print(f"♻️ PDFs in {input_folder} changed, reloading")
+
+            collection = load_collection(
+                pdf_paths, self.perf_settings.get("parallel_workers", 1),
+                self.perf_settings.get("text_extraction_profile", DEFAULT_TEXT_PROFILE),
+                artifact_cache=self.artifact_cache,
+                collapse_furniture=self.perf_settings.get("collapse_page_furniture", False)
+            )
+            token_budget = self.perf_settings.get("encode_token_budget", DEFAULT_TOKEN_BUDGET)
+            embed_collection(collection, self.encoder, embedding_cache=self.embedding_cache,
+                             artifact_cache=self.artifact_cache,
+                             batch_size=self.perf_settings.get("encode_batch_size", 64),
+                             token_budget=token_budget)
+            print_encode_stats()
+            index = store = None
+            if self.ann_shortlist > 0:
+                n_probe = self.perf_settings.get("ann_n_probe", 16)
+                index = build_index(collection.embeddings_by_pdf, n_probe=n_probe)
+            if self.embedding_storage != "float32":
+                store = QuantizedEmbeddings(collection.embeddings_by_pdf, self.embedding_storage)
+                # Later exact scoring reads the memory-mapped float32 rows instead, so the
+                # float32 matrices (also memoised by the artifact cache) can be freed
+                collection.embeddings_by_pdf = store.embeddings_by_doc()
+                self.artifact_cache.forget_embeddings(
+                    [content_hash(pdf_path) for pdf_path in collection.candidates_by_pdf],
+                    collection.profile, collection.embedding_cache_name(self.encoder)
+                )
+                rss, file_backed = process_rss_bytes()
+                print(f"🗜️ {len(store)} embeddings stored as {self.embedding_storage}: "
+                      f"{store.nbytes / 2**20:.1f} MiB in RAM "
+                      f"(float32: {store.float32_nbytes / 2**20:.1f} MiB); process RSS "
+                      f"{rss / 2**20:.0f} MiB, {file_backed / 2**20:.0f} MiB of it file-backed")
+
+            with self._state_lock:
+                self._loaded[input_folder] = (fingerprint, collection, index, store)
+                self.collections[input_folder] = collection
+            # Queries still holding the old store keep its memory map, which outlives the file
+            if loaded is not None and loaded[3] is not None:
+                loaded[3].close()
+            print(f"📚 Loaded {len(collection.candidates_by_pdf)}/{len(pdf_paths)} PDFs "
+                  f"from {input_folder}")
+            return collection, index, store
+
+    def get_collection(self, input_folder):
+        """Return the LoadedCollection for a folder, parsing and embedding it on first use"""
+        return self._load(input_folder)[0]
+
+    def query(self, request):
+        """Answer one persona/job query with the Round 1B output dict"""
+        request = resolve_query(self.config, request)
+        top_k_matches = request["top_k_matches"]
+        top_k_output = request["top_k_output"]
+
+        start = time.perf_counter()
+        collection, index, store = self._load(request["input_folder"])
+        if index is not None:
+            matches_by_pdf = match_collection_with_index(
+                index, collection.candidates_by_pdf, request["job_query"],
+                collection.embeddings_by_pdf, top_k=top_k_matches, model=self.encoder,
+                embedding_cache=self.embedding_cache, shortlist=self.ann_shortlist
+            )
+        elif store is not None:
+            matches_by_pdf = match_collection_quantized(
+                store, collection.candidates_by_pdf, request["job_query"],
+                top_k=top_k_matches, model=self.encoder, embedding_cache=self.embedding_cache
+            )
+        else:
+            matches_by_pdf = match_collection_to_job_query(
+                collection.candidates_by_pdf, request["job_query"], top_k=top_k_matches,
+                model=self.encoder, embedding_cache=self.embedding_cache,
+                candidate_embeddings=collection.embeddings_by_pdf
+            )
+
+        formatter = Round1BFormatter(collection.input_documents, request["persona"],
+                                     request["job_to_be_done"], top_k=top_k_output,
+                                     bounded=self.perf_settings.get("bounded_output", False))
+        for pdf_path, sections, error in collection_sections(collection, matches_by_pdf):
+            if error is not None:
+                print(f"Error processing {os.path.basename(pdf_path)}: {error}")
+            elif sections:
+                formatter.add_pdf_results(os.path.basename(pdf_path), sections)
+
+        output = formatter.build_round1b_output()
+        print(f"🔎 Answered query on {request['input_folder']} in "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        return output
+
+    def close(self):
+        for _, _, _, store in self._loaded.values():
+            if store is not None:
+                store.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+        self.artifact_cache.close()
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        self._send_json(200, {"status": "ok", "collections": sorted(self.service.collections)})
+
+    def do_POST(self):
+        if self.path != "/query":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("Request body must be a JSON object")
+            self._send_json(200, self.service.query(request))
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default=os.environ.get("CONFIG_PATH", "config.json"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--preload", nargs="*", default=[],
+                        help="collection names to load at startup, or 'all'")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    preload = list(config["collections"]) if args.preload == ["all"] else args.preload
+    unknown = [name for name in preload if name not in config["collections"]]
+    if unknown:
+        parser.error(f"unknown collection for --preload: {', '.join(unknown)} "
+                     f"(configured: {', '.join(config['collections'])})")
+    service = QueryService(config)
+    for name in preload:
+        service.get_collection(config["collections"][name]["input_folder"])
+
+    QueryHandler.service = service
+    server = ThreadingHTTPServer((args.host, args.port), QueryHandler)
+    print(f"🚀 Round 1B query service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
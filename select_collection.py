@@ -3,7 +3,8 @@ import sys
 import os
 
 # Import the process_collection function from the main script
-from extract1btent import load_config, process_collection
+from extract1btent import encoder_settings, load_config, process_collection
+from src.model_registry import warm_up
 
 def select_collection_interactive():
     """Interactive collection selection"""
@@ -30,6 +31,8 @@ def select_collection_interactive():
             
             if choice == 'all':
                 print("\nProcessing all collections...")
+                # Load the encoder once; every collection reuses it
+                warm_up(**encoder_settings(config))
                 for collection in collections:
                     process_collection(collection, config)
                 break
@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .disk_cache import DiskCache, file_sha256
+from .document_model import ParsedDocument
+
+# Bump whenever parsing or candidate extraction changes its output, so stale
+# artifacts from an older pipeline are never reused
+PIPELINE_VERSION = "1"
+
+# Process-wide memo shared by every ArtifactCache, so a PDF that appears in
+# several collections of one run is parsed (or read from disk) only once
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+_MEMO_MAX_ENTRIES = 256
+
+_file_hashes = {}
+
+
+def content_hash(path):
+    """sha256 of a file's bytes, memoised per (path, size, mtime)"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _file_hashes.get(key)
+    if digest is None:
+        digest = file_sha256(path)
+        _file_hashes[key] = digest
+    return digest
+
+
+def _memo_get(key):
+    with _memo_lock:
+        value = _memo.get(key)
+        if value is not None:
+            _memo.move_to_end(key)
+        return value
+
+
+def _memo_put(key, value):
+    with _memo_lock:
+        _memo[key] = value
+        _memo.move_to_end(key)
+        while len(_memo) > _MEMO_MAX_ENTRIES:
+            _memo.popitem(last=False)
+
+
+def _memo_discard(keys):
+    with _memo_lock:
+        for key in keys:
+            _memo.pop(key, None)
+
+
+def clear_memo():
+    """Drop the in-memory artifacts (the on-disk store is untouched)"""
+    with _memo_lock:
+        _memo.clear()
+
+
+class ArtifactCache:
+    """Per-PDF parse results, heading candidates and candidate embeddings
+
+    Entries are keyed by (file content hash, PIPELINE_VERSION, text extraction
+    profile), plus the model name for embeddings. Lookups go to the in-process
+    memo first and then to the SQLite store at path; with path=None only the
+    memo is used.
+    """
+
+    def __init__(self, path=None, max_mb=512):
+        self.store = None
+        if path:
+            self.store = DiskCache(path, max_bytes=int(max_mb * 1024 * 1024),
+                                   table="pdf_artifacts")
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(digest, profile, model_name=None):
+        key = f"{digest}:{PIPELINE_VERSION}:{profile}"
+        # "emb32": float32 matrices (older float16 entries are left unread)
+        return f"{key}:emb32:{model_name}" if model_name else key
+
+    def _get_many(self, keys, decode):
+        found = {}
+        missing = []
+        for key in keys:
+            value = _memo_get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        self.memory_hits += len(found)
+
+        if self.store is not None and missing:
+            for key, blob in self.store.get_many(missing).items():
+                found[key] = decode(blob)
+                _memo_put(key, found[key])
+                self.disk_hits += 1
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def get_documents(self, digests, profile):
+        """Return {content hash: (parsed, candidates)} for every cached document"""
+        keys = {self._key(digest, profile): digest for digest in digests}
+        found = self._get_many(list(keys), _decode_document)
+        return {keys[key]: value for key, value in found.items()}
+
+    def put_document(self, digest, profile, parsed, candidates):
+        key = self._key(digest, profile)
+        _memo_put(key, (parsed, candidates))
+        if self.store is not None:
+            self.store.put(key, _encode_document(parsed, candidates))
+
+    def get_embeddings(self, digests, profile, model_name):
+        """Return {content hash: float32 matrix aligned with that document's candidates}"""
+        keys = {self._key(digest, profile, model_name): digest for digest in digests}
+        found = self._get_many(list(keys), _decode_embeddings)
+        return {keys[key]: value for key, value in found.items()}
+
+    def put_embeddings(self, embeddings_by_digest, profile, model_name):
+        """Store candidate embedding matrices (float32 on disk)
+
+        Returns {content hash: float32 matrix} as a later get_embeddings will
+        read it back, so the run that encoded a document can score what
+        later runs will see.
+        """
+        items = {}
+        stored = {}
+        for digest, embeddings in embeddings_by_digest.items():
+            key = self._key(digest, profile, model_name)
+            items[key] = _encode_embeddings(np.asarray(embeddings, dtype=np.float32))
+            # Memoise what a disk read would return, so hits look the same either way
+            stored[digest] = _decode_embeddings(items[key])
+            _memo_put(key, stored[digest])
+        if self.store is not None:
+            self.store.put_many(items)
+        return stored
+
+    def forget_embeddings(self, digests, profile, model_name):
+        """Drop memoised embedding matrices (the on-disk copies stay)
+
+        For callers that keep the embeddings in another form, such as the query
+        service's compressed store, so the float32 matrices can be freed.
+        """
+        _memo_discard([self._key(digest, profile, model_name) for digest in digests])
+
+    def stats(self):
+        """Return memory/disk hit and miss counters"""
+        return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits,
+                "misses": self.misses}
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+def _encode_document(parsed, candidates):
+    header = json.dumps(candidates).encode("utf-8")
+    return len(header).to_bytes(8, "little") + header + parsed.to_bytes()
+
+
+def _decode_document(blob):
+    size = int.from_bytes(blob[:8], "little")
+    candidates = json.loads(bytes(blob[8:8 + size]).decode("utf-8"))
+    return ParsedDocument.from_bytes(bytes(blob[8 + size:])), candidates
+
+
+def _encode_embeddings(embeddings):
+    rows, dim = embeddings.shape if embeddings.size else (0, 0)
+    return (rows.to_bytes(4, "little") + dim.to_bytes(4, "little")
+            + embeddings.astype(np.float32).tobytes())
+
+
+def _decode_embeddings(blob):
+    rows = int.from_bytes(blob[:4], "little")
+    dim = int.from_bytes(blob[4:8], "little")
+    return np.frombuffer(blob[8:], dtype=np.float32).reshape(rows, dim).copy()
@@ -0,0 +1,226 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .artifact_cache import content_hash
+from .document_model import DEFAULT_TEXT_PROFILE, parse_document
+from .heading_extractor import extract_heading_candidates_from_doc, extract_sections_from_headings
+from .model_registry import DEFAULT_MODEL_NAME
+from .page_furniture import collapse_repeated_candidates
+from .semantic_matcher import DEFAULT_TOKEN_BUDGET, encode_collection, encoder_cache_name
+
+
+def extract_pdf_candidates(pdf_path, profile=DEFAULT_TEXT_PROFILE):
+    """Parse one PDF and extract its heading candidates
+
+    Top-level so it can run in a worker process; the returned ParsedDocument
+    is plain Python data and pickles back to the parent for section slicing.
+    """
+    parsed = parse_document(pdf_path, profile=profile)
+    candidates = extract_heading_candidates_from_doc(parsed)
+    return parsed, candidates
+
+
+def extract_collection_candidates(pdf_paths, workers=1, profile=DEFAULT_TEXT_PROFILE,
+                                  artifact_cache=None):
+    """Yield (pdf_path, parsed, candidates, error) for every PDF, in pdf_paths order
+
+    With workers > 1 the PDFs are parsed in a process pool; results are still
+    yielded in input order so downstream ranking stays deterministic. A failure
+    in one PDF is returned as its error string and does not affect the others.
+    profile is the text extraction profile passed to parse_document.
+
+    With an ArtifactCache, PDFs are looked up by content hash first and only
+    the distinct documents it does not hold are parsed (and then stored).
+    """
+    if artifact_cache is None:
+        yield from _extract_uncached(pdf_paths, workers, profile)
+        return
+
+    digests = {}
+    errors = {}
+    for pdf_path in pdf_paths:
+        try:
+            digests[pdf_path] = content_hash(pdf_path)
+        except OSError as e:
+            errors[pdf_path] = str(e)
+
+    extracted = artifact_cache.get_documents(set(digests.values()), profile)
+    to_parse = {}
+    for pdf_path, digest in digests.items():
+        if digest not in extracted and digest not in to_parse:
+            to_parse[digest] = pdf_path
+
+    parse_errors = {}
+    for pdf_path, parsed, candidates, error in _extract_uncached(list(to_parse.values()),
+                                                                 workers, profile):
+        digest = digests[pdf_path]
+        if error is not None:
+            parse_errors[digest] = error
+            continue
+        artifact_cache.put_document(digest, profile, parsed, candidates)
+        extracted[digest] = (parsed, candidates)
+
+    for pdf_path in pdf_paths:
+        digest = digests.get(pdf_path)
+        if digest in extracted:
+            parsed, candidates = extracted[digest]
+            yield pdf_path, parsed, candidates, None
+        else:
+            yield pdf_path, None, None, errors.get(pdf_path) or parse_errors[digest]
+
+
+def _extract_uncached(pdf_paths, workers, profile):
+    if workers <= 1 or len(pdf_paths) <= 1:
+        for pdf_path in pdf_paths:
+            try:
+                parsed, candidates = extract_pdf_candidates(pdf_path, profile)
+                yield pdf_path, parsed, candidates, None
+            except Exception as e:
+                yield pdf_path, None, None, str(e)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(pdf_paths))) as executor:
+        futures = [executor.submit(extract_pdf_candidates, pdf_path, profile)
+                   for pdf_path in pdf_paths]
+        for pdf_path, future in zip(pdf_paths, futures):
+            try:
+                parsed, candidates = future.result()
+                yield pdf_path, parsed, candidates, None
+            except Exception as e:
+                yield pdf_path, None, None, str(e)
+
+
+class LoadedCollection:
+    """Parsed PDFs, heading candidates and (once embedded) candidate embeddings of a folder"""
+
+    def __init__(self, pdf_paths, parsed_by_pdf, candidates_by_pdf, profile=DEFAULT_TEXT_PROFILE):
+        self.pdf_paths = pdf_paths
+        self.parsed_by_pdf = parsed_by_pdf
+        self.candidates_by_pdf = candidates_by_pdf
+        self.profile = profile
+        self.embeddings_by_pdf = None
+        # Running headers / footers removed by load_collection(collapse_furniture=True)
+        self.furniture_stats = {"candidates": 0, "texts": 0}
+        self.furniture_collapsed = False
+
+    def embedding_cache_name(self, encoder, model_name=DEFAULT_MODEL_NAME):
+        """Artifact-cache name for this collection's embedding matrices
+
+        Collapsing page furniture changes which candidate rows a matrix holds,
+        so collapsed and full candidate lists are cached under different names.
+        """
+        cache_name = encoder_cache_name(encoder, model_name)
+        return f"{cache_name}:collapsed" if self.furniture_collapsed else cache_name
+
+    @property
+    def input_documents(self):
+        return [os.path.basename(pdf_path) for pdf_path in self.pdf_paths]
+
+    def subset(self, pdf_paths):
+        """A view restricted to pdf_paths (in that order), sharing the loaded data"""
+        subset = LoadedCollection(
+            pdf_paths,
+            {p: self.parsed_by_pdf[p] for p in pdf_paths if p in self.parsed_by_pdf},
+            {p: self.candidates_by_pdf[p] for p in pdf_paths if p in self.candidates_by_pdf},
+            self.profile,
+        )
+        subset.furniture_collapsed = self.furniture_collapsed
+        if self.embeddings_by_pdf is not None:
+            subset.embeddings_by_pdf = {p: self.embeddings_by_pdf[p]
+                                        for p in subset.candidates_by_pdf}
+        return subset
+
+
+def load_collection(pdf_paths, workers=1, profile=DEFAULT_TEXT_PROFILE, artifact_cache=None,
+                    collapse_furniture=False):
+    """Parse every PDF once and keep the ones with heading candidates (stage 1)
+
+    With collapse_furniture, running headers and footers repeated across a
+    PDF's pages (see page_furniture) are cut down to their first occurrence
+    before anything is encoded or scored.
+    """
+    candidates_by_pdf = {}
+    parsed_by_pdf = {}
+    raw_texts = set()
+    removed = 0
+    for pdf_path, parsed, candidates, error in extract_collection_candidates(
+            pdf_paths, workers, profile, artifact_cache=artifact_cache):
+        pdf_name = os.path.basename(pdf_path)
+        print(f"\nProcessing: {pdf_name}")
+
+        if error is not None:
+            print(f"Error processing {pdf_name}: {error}")
+            continue
+
+        print(f"Found {len(candidates)} heading candidates.")
+
+        if not candidates:
+            print(f"No candidates found in {pdf_name}, skipping...")
+            continue
+
+        if collapse_furniture:
+            raw_texts.update(c["text"] for c in candidates)
+            candidates, stats = collapse_repeated_candidates(candidates, parsed.page_height)
+            if stats["candidates"]:
+                print(f"Collapsed {stats['candidates']} repeated header/footer candidates "
+                      f"({stats['groups']} running lines).")
+                removed += stats["candidates"]
+
+        # The same ParsedDocument feeds section extraction in stage 3
+        candidates_by_pdf[pdf_path] = candidates
+        parsed_by_pdf[pdf_path] = parsed
+
+    collection = LoadedCollection(pdf_paths, parsed_by_pdf, candidates_by_pdf, profile)
+    collection.furniture_collapsed = collapse_furniture
+    if removed:
+        # Texts seen only in removed candidates are the encoder inputs saved
+        kept_texts = {c["text"] for cands in candidates_by_pdf.values() for c in cands}
+        collection.furniture_stats = {"candidates": removed, "texts": len(raw_texts - kept_texts)}
+        print(f"Page furniture: {removed} candidates collapsed, "
+              f"{len(raw_texts - kept_texts)} fewer texts to encode")
+    return collection
+
+
+def embed_collection(collection, encoder, model_name=DEFAULT_MODEL_NAME, embedding_cache=None,
+                     artifact_cache=None, batch_size=64, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Fill collection.embeddings_by_pdf, reusing artifact-cached matrices of unchanged PDFs"""
+    digests = {}
+    precomputed = {}
+    cache_name = collection.embedding_cache_name(encoder, model_name)
+    if artifact_cache is not None:
+        digests = {pdf_path: content_hash(pdf_path) for pdf_path in collection.candidates_by_pdf}
+        cached = artifact_cache.get_embeddings(set(digests.values()), collection.profile,
+                                               cache_name)
+        precomputed = {pdf_path: cached[digest] for pdf_path, digest in digests.items()
+                       if digest in cached}
+
+    embeddings_by_pdf = encode_collection(
+        collection.candidates_by_pdf, encoder, model_name, embedding_cache=embedding_cache,
+        batch_size=batch_size, precomputed=precomputed, token_budget=token_budget
+    )
+    if artifact_cache is not None:
+        stored = artifact_cache.put_embeddings(
+            {digests[pdf_path]: embeddings for pdf_path, embeddings in embeddings_by_pdf.items()
+             if pdf_path not in precomputed},
+            collection.profile, cache_name
+        )
+        # Score the matrices as the cache holds them, so cold and warm runs agree
+        for pdf_path in embeddings_by_pdf:
+            if pdf_path not in precomputed:
+                embeddings_by_pdf[pdf_path] = stored[digests[pdf_path]]
+    collection.embeddings_by_pdf = embeddings_by_pdf
+    return embeddings_by_pdf
+
+
+def collection_sections(collection, matches_by_pdf, max_words=150):
+    """Yield (pdf_path, sections, error) for every PDF with matches (stage 3)"""
+    for pdf_path, top_matches in matches_by_pdf.items():
+        if not top_matches:
+            yield pdf_path, [], None
+            continue
+        try:
+            sections = extract_sections_from_headings(collection.parsed_by_pdf[pdf_path],
+                                                      top_matches, max_words=max_words)
+            yield pdf_path, sections, None
+        except Exception as e:
+            yield pdf_path, None, str(e)
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# SQLite caps the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """Small SQLite-backed key/value store with size-based LRU eviction"""
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, table="entries"):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table} (last_used)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """Return a dict of key -> value for every key present in the cache"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        if not keys:
+            return found
+
+        with self._lock:
+            for start in range(0, len(keys), _SQL_CHUNK):
+                chunk = keys[start:start + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key):
+        """Return the value for a single key, or None"""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items):
+        """Insert or replace several key -> bytes entries in one transaction"""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, sqlite3.Binary(value), len(value), now) for key, value in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._evict_locked()
+
+    def put(self, key, value):
+        """Insert or replace a single entry"""
+        self.put_many({key: value})
+
+    def delete_many(self, keys):
+        """Remove the given keys from the cache"""
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), _SQL_CHUNK):
+                chunk = keys[start:start + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ({placeholders})", chunk
+                )
+            self._conn.commit()
+
+    def total_bytes(self):
+        with self._lock:
+            return self._total_bytes_locked()
+
+    def _total_bytes_locked(self):
+        row = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+        return row[0]
+
+    def _evict_locked(self):
+        """Drop least recently used entries until the store is back under budget"""
+        total = self._total_bytes_locked()
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% so that every insert near the limit does not evict again
+        target = int(self.max_bytes * 0.9)
+        doomed = []
+        for key, size in self._conn.execute(
+            f"SELECT key, size FROM {self.table} ORDER BY last_used ASC"
+        ):
+            if total <= target:
+                break
+            doomed.append(key)
+            total -= size
+
+        for start in range(0, len(doomed), _SQL_CHUNK):
+            chunk = doomed[start:start + _SQL_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key IN ({placeholders})", chunk)
+        self._conn.commit()
+        self.evictions += len(doomed)
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current store size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self.total_bytes(),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
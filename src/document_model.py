@@ -0,0 +1,214 @@
+import io
+import json
+
+import fitz  # PyMuPDF
+import numpy as np
+
+# get_text() flag sets; None keeps PyMuPDF's defaults, which also decode image blocks.
+# "lean" is the installed version's "dict" defaults (ligatures, whitespace, mediabox
+# clip, and CID fallback on newer releases) minus TEXT_PRESERVE_IMAGES, so the text is
+# unchanged and only the image payloads are skipped.
+TEXT_PROFILES = {
+    "default": None,
+    "lean": fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES,
+}
+DEFAULT_TEXT_PROFILE = "lean"
+
+
+def text_flags(profile=DEFAULT_TEXT_PROFILE):
+    """Return the get_text() flags for an extraction profile name"""
+    if profile not in TEXT_PROFILES:
+        raise ValueError(f"Unknown text extraction profile: {profile!r}")
+    return TEXT_PROFILES[profile]
+
+
+class ParsedPage:
+    """View of a single page's rows in the document's line table"""
+
+    def __init__(self, doc, page_num):
+        self.doc = doc
+        self.page_num = page_num
+        self.width = float(doc.page_width[page_num])
+        self.height = float(doc.page_height[page_num])
+        self.line_start = int(doc.page_line_start[page_num])
+        self.line_end = int(doc.page_line_start[page_num + 1])
+        self._y_keys = None
+        self._y_order = None
+
+    @property
+    def line_count(self):
+        return self.line_end - self.line_start
+
+    def line_indices(self):
+        """Document-wide indices of this page's lines, in block/line order"""
+        return range(self.line_start, self.line_end)
+
+    def span_range(self):
+        """(start, end) of this page's rows in the span table"""
+        starts = self.doc.line_span_start
+        return int(starts[self.line_start]), int(starts[self.line_end])
+
+    def _build_y_index(self):
+        ys = self.doc.line_bbox[self.line_start:self.line_end, 1]
+        order = np.argsort(ys, kind="stable")
+        self._y_order = order
+        self._y_keys = ys[order]
+
+    def lines_in_band(self, start_y=None, end_y=None):
+        """Return indices of lines with start_y <= y0 < end_y, in reading (block/line) order
+
+        Uses a y-sorted index so only the matching lines are touched; either
+        bound may be None to leave that side open.
+        """
+        if start_y is None and end_y is None:
+            return list(self.line_indices())
+        if self._y_keys is None:
+            self._build_y_index()
+        lo = 0 if start_y is None else int(np.searchsorted(self._y_keys, start_y, side="left"))
+        hi = self.line_count if end_y is None else int(np.searchsorted(self._y_keys, end_y, side="left"))
+        if lo >= hi:
+            return []
+        return (np.sort(self._y_order[lo:hi]) + self.line_start).tolist()
+
+
+class ParsedDocument:
+    """A PDF parsed once into flat span/line tables
+
+    Spans and lines are stored column-wise rather than as a dict per span:
+    span_text / span_font (index into fonts) / span_size / span_flags /
+    span_bbox (N x 4) / span_line, and per line line_bbox (M x 4) / line_size
+    (max span size) / line_page, with line_span_start and page_line_start
+    holding the CSR-style offsets. Shared by candidate and section extraction.
+    """
+
+    def __init__(self, name, page_width, page_height, page_line_start, line_bbox,
+                 line_span_start, span_text, span_font, fonts, span_size, span_flags, span_bbox):
+        self.name = name
+        self.page_width = page_width
+        self.page_height = page_height
+        self.page_line_start = page_line_start
+        self.line_bbox = line_bbox
+        self.line_span_start = line_span_start
+        self.span_text = span_text
+        self.span_font = span_font
+        self.fonts = fonts
+        self.span_size = span_size
+        self.span_flags = span_flags
+        self.span_bbox = span_bbox
+
+        line_counts = np.diff(page_line_start)
+        span_counts = np.diff(line_span_start)
+        self.line_page = np.repeat(np.arange(len(page_width), dtype=np.int32), line_counts)
+        self.span_line = np.repeat(np.arange(len(line_bbox), dtype=np.int32), span_counts)
+        self.span_page = self.line_page[self.span_line]
+        self.line_size = np.zeros(len(line_bbox), dtype=np.float64)
+        if len(span_size):
+            nonempty = span_counts > 0
+            self.line_size[nonempty] = np.maximum.reduceat(
+                span_size, line_span_start[:-1][nonempty]
+            )
+        self.pages = [ParsedPage(self, page_num) for page_num in range(len(page_width))]
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    @property
+    def span_count(self):
+        return len(self.span_text)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def line_text(self, line_index):
+        """Concatenated span text of a line, each span followed by a space"""
+        start = self.line_span_start[line_index]
+        end = self.line_span_start[line_index + 1]
+        return "".join(text + " " for text in self.span_text[start:end])
+
+    def font_size_stats(self):
+        """Return min/median/max span font size over the whole document"""
+        if not len(self.span_size):
+            return {"min": 0.0, "median": 0.0, "max": 0.0}
+        sizes = np.sort(self.span_size)
+        return {"min": float(sizes[0]), "median": float(sizes[len(sizes) // 2]),
+                "max": float(sizes[-1])}
+
+    def to_bytes(self):
+        """Serialize the tables as an .npz blob (strings stored as UTF-8 JSON)"""
+        strings = json.dumps({"name": self.name, "fonts": self.fonts, "span_text": self.span_text})
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            strings=np.frombuffer(strings.encode("utf-8"), dtype=np.uint8),
+            **{field: getattr(self, field) for field in _ARRAY_FIELDS},
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """Rebuild a ParsedDocument written by to_bytes"""
+        with np.load(io.BytesIO(blob), allow_pickle=False) as arrays:
+            strings = json.loads(arrays["strings"].tobytes().decode("utf-8"))
+            fields = {field: arrays[field] for field in _ARRAY_FIELDS}
+        return cls(strings["name"], span_text=strings["span_text"], fonts=strings["fonts"],
+                   **fields)
+
+
+_ARRAY_FIELDS = ("page_width", "page_height", "page_line_start", "line_bbox", "line_span_start",
+                 "span_font", "span_size", "span_flags", "span_bbox")
+
+
+def _parse_pages(doc, name, flags):
+    page_width, page_height, page_line_start = [], [], [0]
+    line_bbox, line_span_start = [], [0]
+    span_text, span_font, span_size, span_flags, span_bbox = [], [], [], [], []
+    font_ids = {}
+
+    for page in doc:
+        page_width.append(page.rect.width)
+        page_height.append(page.rect.height)
+        for block in page.get_text("dict", flags=flags)["blocks"]:
+            for line in block.get("lines", []):
+                line_bbox.append(tuple(line["bbox"]))
+                for span in line["spans"]:
+                    span_text.append(span["text"])
+                    span_font.append(font_ids.setdefault(span["font"], len(font_ids)))
+                    span_size.append(span["size"])
+                    span_flags.append(span["flags"])
+                    span_bbox.append(tuple(span["bbox"]))
+                line_span_start.append(len(span_text))
+        page_line_start.append(len(line_bbox))
+
+    return ParsedDocument(
+        name,
+        page_width=np.array(page_width, dtype=np.float64),
+        page_height=np.array(page_height, dtype=np.float64),
+        page_line_start=np.array(page_line_start, dtype=np.int64),
+        line_bbox=np.array(line_bbox, dtype=np.float64).reshape(-1, 4),
+        line_span_start=np.array(line_span_start, dtype=np.int64),
+        span_text=span_text,
+        span_font=np.array(span_font, dtype=np.int32),
+        fonts=list(font_ids),
+        span_size=np.array(span_size, dtype=np.float64),
+        span_flags=np.array(span_flags, dtype=np.int32),
+        span_bbox=np.array(span_bbox, dtype=np.float64).reshape(-1, 4),
+    )
+
+
+def parse_document(source, profile=DEFAULT_TEXT_PROFILE):
+    """Parse a PDF path or open fitz.Document into a ParsedDocument
+
+    A ParsedDocument passed in is returned unchanged, so callers can accept
+    any of the three without parsing twice. profile names the get_text()
+    flag set (see TEXT_PROFILES); "lean" skips image blocks.
+    """
+    if isinstance(source, ParsedDocument):
+        return source
+
+    flags = text_flags(profile)
+    if isinstance(source, fitz.Document):
+        return _parse_pages(source, source.name, flags)
+
+    with fitz.open(source) as doc:
+        return _parse_pages(doc, str(source), flags)
@@ -0,0 +1,59 @@
+import hashlib
+
+import numpy as np
+
+from .disk_cache import DiskCache
+
+
+def normalize_text(text):
+    """Collapse whitespace so texts that tokenize identically share one key"""
+    return " ".join(text.split())
+
+
+def embedding_key(model_name, text, dtype="float32"):
+    """Content-addressed key for (model name, normalized text, stored dtype)"""
+    payload = f"{model_name}\x00{dtype}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent embedding store backed by a SQLite DiskCache
+
+    Vectors are stored as float32 by default, so cached and freshly encoded
+    runs score exactly like uncached ones; dtype="float16" halves the size at
+    the cost of small score drift.
+    """
+
+    def __init__(self, path, max_mb=256, dtype="float32"):
+        self.dtype = np.dtype(dtype)
+        self.store = DiskCache(path, max_bytes=int(max_mb * 1024 * 1024), table="embeddings")
+
+    def get_many(self, model_name, texts):
+        """Return {text: float32 vector} for every text already in the cache"""
+        keys = {text: embedding_key(model_name, text, self.dtype.name) for text in texts}
+        blobs = self.store.get_many(keys.values())
+        found = {}
+        for text, key in keys.items():
+            blob = blobs.get(key)
+            if blob is not None:
+                found[text] = np.frombuffer(blob, dtype=self.dtype).astype(np.float32)
+        return found
+
+    def put_many(self, model_name, texts, vectors):
+        """Bulk-insert embeddings for texts (rows of vectors align with texts)
+
+        Returns the float32 matrix a later get_many will read back, so callers
+        can use the stored precision for fresh vectors too.
+        """
+        vectors = np.asarray(vectors, dtype=self.dtype)
+        items = {}
+        for text, vector in zip(texts, vectors):
+            items[embedding_key(model_name, text, self.dtype.name)] = vector.tobytes()
+        self.store.put_many(items)
+        return vectors.astype(np.float32)
+
+    def stats(self):
+        return self.store.stats()
+
+    def close(self):
+        self.store.close()
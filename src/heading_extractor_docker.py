@@ -5,6 +5,12 @@ from collections import Counter
 from concurrent.futures import ThreadPoolExecutor, wait
 import time
 from .text_utils import clean_text, is_bold_font, is_all_upper, is_title_case, is_binary_data
+from .document_model import DEFAULT_TEXT_PROFILE, parse_document, text_flags
+from .heading_features import REASON_BOLD, REASON_LARGER_FONT, find_heading_candidates
+from .layout_cache import LayoutCache, document_hash
+from .layout_pipeline import (
+    LAYOUT_DPI, PageWordIndex, headings_near, run_layout_pipeline, select_layout_pages
+)
 
 # Try to import PaddleOCR, but make it optional
 try:
@@ -16,9 +22,23 @@ except ImportError:
 
 
 class HybridHeadingExtractor:
-    def __init__(self, enable_layout_detection=False):
-        self.layout_cache = {}  # Cache for layout results
+    def __init__(self, enable_layout_detection=False, layout_batch_size=4, layout_prefetch=8,
+                 layout_mode="all", layout_cache_path=None, layout_cache_max_mb=64,
+                 text_profile=DEFAULT_TEXT_PROFILE):
+        # Persistent per-page layout results, keyed by PDF content hash (None disables it)
+        self.layout_cache = None
+        if layout_cache_path:
+            self.layout_cache = LayoutCache(layout_cache_path, max_mb=layout_cache_max_mb)
+        self.layout_model_id = "PP-DocLayout-M"
         self.layout_model = None
+        self.layout_batch_size = layout_batch_size  # Pages per predict() call
+        self.layout_prefetch = layout_prefetch  # Rendered pages queued ahead of inference
+        # "all" runs layout detection on every page; "gated" only where heuristics are unsure
+        self.layout_mode = layout_mode
+        self.last_gating_stats = None
+        # get_text() flag set used for every page parse and word extraction
+        self.text_profile = text_profile
+        self.text_flags = text_flags(text_profile)
         
         # Initialize layout model with CPU-only settings
         if enable_layout_detection and PADDLEOCR_AVAILABLE:
@@ -77,25 +97,33 @@ class HybridHeadingExtractor:
         print("  🔄 Running hybrid extraction (Layout + Heuristic)...")
         
         # Run both approaches in parallel for speed
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            print("  ⏳ Starting parallel extraction...")
-            layout_future = executor.submit(self._run_layout_detection, doc)
-            heuristic_future = executor.submit(self._run_heuristic_extraction, doc)
-            
-            # Wait for both to complete with timeout
+        if self.layout_mode == "gated":
+            # Heuristics first, then layout only on the pages they are unsure about
             try:
-                print("  ⏳ Waiting for layout detection...")
-                layout_headings = layout_future.result(timeout=300)
-                print(f"  ✓ Layout detection complete. Found {len(layout_headings)} headings.")
-                
-                print("  ⏳ Waiting for heuristic extraction...")
-                heuristic_headings = heuristic_future.result(timeout=300)
-                print(f"  ✓ Heuristic extraction complete. Found {len(heuristic_headings)} headings.")
-                
+                heuristic_headings, layout_headings = self._run_gated_extraction(doc)
             except Exception as e:
-                print(f"  ❌ Error in parallel extraction: {e}")
-                # Fallback to heuristic only if parallel processing fails
+                print(f"  ❌ Error in gated extraction: {e}")
                 return self._run_heuristic_extraction(doc)
+        else:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                print("  ⏳ Starting parallel extraction...")
+                layout_future = executor.submit(self._run_layout_detection, doc)
+                heuristic_future = executor.submit(self._run_heuristic_extraction, doc)
+            
+                # Wait for both to complete with timeout
+                try:
+                    print("  ⏳ Waiting for layout detection...")
+                    layout_headings = layout_future.result(timeout=300)
+                    print(f"  ✓ Layout detection complete. Found {len(layout_headings)} headings.")
+                
+                    print("  ⏳ Waiting for heuristic extraction...")
+                    heuristic_headings = heuristic_future.result(timeout=300)
+                    print(f"  ✓ Heuristic extraction complete. Found {len(heuristic_headings)} headings.")
+                
+                except Exception as e:
+                    print(f"  ❌ Error in parallel extraction: {e}")
+                    # Fallback to heuristic only if parallel processing fails
+                    return self._run_heuristic_extraction(doc)
         
         # Merge and rank results
         print("  🔄 Merging results...")
@@ -110,97 +138,96 @@ class HybridHeadingExtractor:
         print(f"  ✓ Semantic matching complete. Final count: {len(result)}")
         return result
     
-    def _run_layout_detection(self, doc):
-        """Extract headings using PP-DocLayout-M"""
+    def _run_layout_detection(self, doc, page_numbers=None):
+        """Extract headings using PP-DocLayout-M (on every page unless page_numbers is given)"""
         if not self.layout_model:
             print("    ⚠️ No layout model available")
             return []
             
         layout_headings = []
-        print(f"    🔍 Running layout detection on {len(doc)} pages...")
-        
-        for page_num, page in enumerate(doc):
+        if page_numbers is None:
+            page_numbers = range(len(doc))
+        page_numbers = list(page_numbers)
+        print(f"    🔍 Running layout detection on {len(page_numbers)} pages...")
+
+        # Pages of an unchanged PDF already seen at this DPI/model skip inference entirely
+        cached_boxes = {}
+        content_hash = None
+        if self.layout_cache is not None and page_numbers:
+            content_hash = document_hash(doc)
+            cached_boxes = self.layout_cache.get_pages(
+                content_hash, page_numbers, LAYOUT_DPI, self.layout_model_id
+            )
+            if cached_boxes:
+                print(f"    💾 Layout cache hit for {len(cached_boxes)}/{len(page_numbers)} pages")
+
+        # Pages are rendered on a producer thread and inferred in batches
+        pipeline = run_layout_pipeline(
+            doc, self.layout_model, page_numbers=[p for p in page_numbers if p not in cached_boxes],
+            batch_size=self.layout_batch_size, prefetch=self.layout_prefetch, dpi=LAYOUT_DPI,
+            text_flags=self.text_flags
+        )
+        headings_by_page = {}
+        detected_boxes = {}
+        for page_num, heading_boxes, words in pipeline:
             print(f"      📄 Processing page {page_num + 1}/{len(doc)}")
-            
-            # Convert page to image and save as temporary file
-            pix = page.get_pixmap(dpi=150, alpha=False)  # 150 DPI for speed
-            
-            # Create temporary image file path
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
-                temp_image_path = temp_file.name
-                # Save the image
-                pix.save(temp_image_path)
-            
-            # Run layout detection
-            try:
-                results = self.layout_model.predict(temp_image_path, batch_size=1)
-                print(f"        ✓ Layout detection completed for page {page_num + 1}")
-                
-                # Extract heading-related boxes
-                heading_boxes = []
-                for result in results:
-                    for box in result.get('boxes', []):
-                        label = box.get('label', '')
-                        if label in ['paragraph_title', 'doc_title']:
-                            heading_boxes.append({
-                                'bbox': box['coordinate'],  # [x0, y0, x1, y1]
-                                'confidence': box['score'],
-                                'type': label,
-                                'page_num': page_num
-                            })
-                
-                print(f"        📦 Found {len(heading_boxes)} heading boxes on page {page_num + 1}")
-                
-                # Extract text from detected boxes
-                page_headings = self._extract_text_from_boxes(page, heading_boxes)
-                print(f"        📝 Extracted {len(page_headings)} headings from page {page_num + 1}")
-                layout_headings.extend(page_headings)
-                
-            except Exception as e:
-                print(f"        ❌ Layout detection failed for page {page_num}: {e}")
+            if heading_boxes is None:
                 continue
-            finally:
-                # Clean up temporary file with retry
-                try:
-                    import os
-                    import time
-                    # Small delay to ensure file is not locked
-                    time.sleep(0.1)
-                    if os.path.exists(temp_image_path):
-                        os.unlink(temp_image_path)
-                except Exception as cleanup_error:
-                    print(f"        ⚠️ Could not clean up temp file: {cleanup_error}")
-                    pass
+            detected_boxes[page_num] = heading_boxes
+            print(f"        ✓ Layout detection completed for page {page_num + 1}")
+            print(f"        📦 Found {len(heading_boxes)} heading boxes on page {page_num + 1}")
+            
+            # Extract text from detected boxes
+            page_headings = self._extract_text_from_boxes(words, heading_boxes)
+            print(f"        📝 Extracted {len(page_headings)} headings from page {page_num + 1}")
+            headings_by_page[page_num] = page_headings
+
+        # The render thread has finished, so reading words for cached pages is safe here
+        for page_num, heading_boxes in cached_boxes.items():
+            words = doc[page_num].get_text("words", flags=self.text_flags)
+            headings_by_page[page_num] = self._extract_text_from_boxes(words, heading_boxes)
+
+        if detected_boxes and self.layout_cache is not None:
+            self.layout_cache.put_pages(content_hash, detected_boxes, LAYOUT_DPI, self.layout_model_id)
+
+        for page_num in page_numbers:
+            layout_headings.extend(headings_by_page.get(page_num, []))
         
         print(f"    ✓ Layout detection complete. Total headings: {len(layout_headings)}")
         return layout_headings
 
-    def _extract_text_from_boxes(self, page, heading_boxes):
-        """Extract text from PP-DocLayout detected boxes using PyMuPDF"""
+    def _run_gated_extraction(self, doc):
+        """Run heuristics, then layout detection only on pages where they are uncertain"""
+        parsed = parse_document(doc, profile=self.text_profile)
+        heuristic_headings = self._run_heuristic_extraction(parsed)
+        print(f"  ✓ Heuristic extraction complete. Found {len(heuristic_headings)} headings.")
+
+        layout_pages, stats = select_layout_pages(parsed, heuristic_headings)
+        self.last_gating_stats = stats
+        print(f"  🚦 Layout gate: {stats['layout_pages']}/{stats['pages']} pages need layout detection "
+              f"({stats['skipped_confident']} confident, {stats['skipped_image_only']} image-only skipped)")
+
+        layout_headings = self._run_layout_detection(doc, page_numbers=layout_pages)
+        print(f"  ✓ Layout detection complete. Found {len(layout_headings)} headings.")
+        return heuristic_headings, layout_headings
+
+    def _extract_text_from_boxes(self, words, heading_boxes):
+        """Extract text from PP-DocLayout detected boxes using the page's PyMuPDF words"""
         headings = []
-        words = page.get_text("words")  # Get all words with coordinates
+        if not heading_boxes:
+            return headings
+
+        # Filter out binary data once and index the words by y
+        word_index = PageWordIndex(words)
         
         for box in heading_boxes:
             x0, y0, x1, y1 = box['bbox']
             
-            # Find words within the bounding box
-            box_words = []
-            for word in words:
-                wx0, wy0, wx1, wy1, text = word[:5]
-                
-                # Filter out binary data immediately
-                if is_binary_data(text):
-                    continue
-                
-                # Check if word overlaps with detected box (with tolerance)
-                if (wx0 >= x0-5 and wy0 >= y0-5 and 
-                    wx1 <= x1+5 and wy1 <= y1+5):
-                    box_words.append((wx0, text))
+            # Find words within the bounding box (with tolerance), sorted by x-coordinate
+            box_words = word_index.words_in_box(box['bbox'], tolerance=5)
             
-            # Sort words by x-coordinate and join
+            # Join the words
             if box_words:
-                box_words.sort(key=lambda w: w[0])
                 heading_text = ' '.join([w[1] for w in box_words])
                 
                 # Clean and validate the final text
@@ -224,128 +251,11 @@ class HybridHeadingExtractor:
     
     def extract_heading_candidates_optimized(self, doc):
         """Optimized version of your existing function"""
-        candidates = []
-        all_lines = []
-        
-        # Your existing logic here, but with these optimizations:
-        for page_num, page in enumerate(doc):
-            blocks = page.get_text("dict")["blocks"]
-            
-            # Add early termination for very long documents
-            if len(all_lines) > 1000:  # Prevent memory issues
-                break
-                
-            # Your existing span processing...
-            spans = []
-            for block in blocks:
-                for line in block.get("lines", []):
-                    for span in line["spans"]:
-                        spans.append({
-                            "text": span["text"],
-                            "font": span["font"],
-                            "size": span["size"],
-                            "flags": span["flags"],
-                            "x0": span["bbox"][0],
-                            "x1": span["bbox"][2],
-                            "y0": span["bbox"][1],
-                            "y1": span["bbox"][3],
-                            "origin_y": line["bbox"][1],
-                            "page_width": page.rect.width,
-                            "page_num": page_num
-                        })
-
-            spans.sort(key=lambda s: (round(s["origin_y"], 1), s["x0"]))
-
-            merged_lines = []
-            buffer = ""
-            last_y = None
-            last_size = None
-            last_span = None
-
-            for span in spans:
-                raw_text = span["text"]
-                
-                # Filter out binary data immediately
-                if is_binary_data(raw_text):
-                    continue
-                    
-                text = clean_text(raw_text)
-                if not text:
-                    continue
-
-                current_y = round(span["origin_y"], 1)
-                size = span["size"]
-                is_new_para = False
-                if last_y is not None and abs(current_y - last_y) > size * 1.2:
-                    is_new_para = True
-
-                if buffer and (re.search(r"[.?!]$", buffer) or is_new_para):
-                    merged_lines.append((buffer.strip(), last_size, last_span))
-                    buffer = text
-                else:
-                    buffer = buffer + " " + text if buffer else text
-
-                last_y = current_y
-                last_size = size
-                last_span = span
-
-            if buffer:
-                merged_lines.append((buffer.strip(), last_size, last_span))
-
-            all_lines.extend(merged_lines)
-
-        line_widths = [span["x1"] - span["x0"] for _, _, span in all_lines]
-        if not line_widths:
-            return []
-
-        rounded_widths = [round(w, -1) for w in line_widths]
-        most_common_width = Counter(rounded_widths).most_common(1)[0][0]
-        threshold_width = 0.75 * most_common_width
-
-        font_sizes = [line[1] for line in all_lines]
-        median_font_size = sorted(font_sizes)[len(font_sizes) // 2] if font_sizes else 12
-
-        for sentence, size, span in all_lines:
-            flags = span["flags"]
-            page_width = span["page_width"]
-            text_width = span["x1"] - span["x0"]
-
-            is_bold = is_bold_font(span)
-            is_italic = (flags & 1) != 0
-            is_centered = abs(span["x0"] - (page_width - span["x1"])) < 20
-
-            word_count = len(sentence.split())
-            reasons = []
-
-            if size > median_font_size * 1.15:
-                reasons.append("Larger font size")
-            if is_bold:
-                reasons.append("Bold font")
-            if is_italic:
-                reasons.append("Italic font")
-            if is_centered and (text_width < threshold_width or word_count < 10):
-                reasons.append("Center aligned (short line)")
-            if is_all_upper(sentence):
-                reasons.append("All uppercase")
-            if is_title_case(sentence):
-                reasons.append("Title case")
-            if word_count < 10 and size > median_font_size:
-                reasons.append("Short & prominent")
-
-            if reasons:
-                candidates.append({
-                    "text": sentence,
-                    "size": size,
-                    "bold": is_bold,
-                    "italic": is_italic,
-                    "centered": is_centered,
-                    "words": word_count,
-                    "width": text_width,
-                    "reasons": reasons,
-                    "page_num": span["page_num"],
-                    "y": span["y0"],
-                    "x0": span["x0"]
-                })
+        # doc may be a fitz.Document or an already parsed ParsedDocument;
+        # stop adding pages past 1000 lines to prevent memory issues
+        candidates = find_heading_candidates(
+            parse_document(doc, profile=self.text_profile), max_lines=1000
+        )
         
         # Convert to consistent format
         formatted_candidates = []
@@ -357,7 +267,7 @@ class HybridHeadingExtractor:
                 'x': candidate.get('x0', 0),
                 'confidence': 0.7,  # Default heuristic confidence
                 'source': 'heuristic',
-                'reasons': candidate['reasons']
+                'reason_mask': candidate['reason_mask']
             })
         
         return formatted_candidates
@@ -365,25 +275,21 @@ class HybridHeadingExtractor:
     def _merge_heading_results(self, layout_headings, heuristic_headings, doc):
         """Merge results from both approaches intelligently"""
         merged = []
-        used_heuristic_indices = set()
         
         # First, add all layout-detected headings (higher confidence)
         for layout_heading in layout_headings:
             layout_heading['method'] = 'layout'
             merged.append(layout_heading)
             
-            # Find and mark nearby heuristic headings as used
-            for i, heuristic_heading in enumerate(heuristic_headings):
-                if (layout_heading['page_num'] == heuristic_heading['page_num'] and
-                    abs(layout_heading['y'] - heuristic_heading['y']) < 20):
-                    used_heuristic_indices.add(i)
+        # Find and mark nearby heuristic headings (same page, within 20pt) as used
+        used_heuristic_indices = headings_near(layout_headings, heuristic_headings, max_dy=20)
         
         # Add remaining heuristic headings (fallback for missed detections)
         for i, heuristic_heading in enumerate(heuristic_headings):
             if i not in used_heuristic_indices:
                 # Only add if it meets quality criteria
-                reasons = heuristic_heading.get('reasons', [])
-                if ('Larger font size' in reasons or 'Bold font' in reasons or 
+                reason_mask = heuristic_heading.get('reason_mask', 0)
+                if (reason_mask & (REASON_LARGER_FONT | REASON_BOLD) or
                     len(heuristic_heading['text'].split()) <= 8):
                     # Convert format to match layout headings
                     merged.append({
@@ -394,7 +300,7 @@ class HybridHeadingExtractor:
                         'confidence': 0.7,  # Default confidence for heuristic
                         'source': 'heuristic',
                         'method': 'heuristic',
-                        'reasons': heuristic_heading.get('reasons', [])
+                        'reason_mask': reason_mask
                     })
         
         # Sort by page and y-coordinate
@@ -406,31 +312,17 @@ class HybridHeadingExtractor:
         """Apply semantic matching to the merged headings"""
         from .semantic_matcher import match_to_job_query
         
-        # Convert to format expected by semantic matcher
-        candidates = []
-        for heading in headings:
-            candidates.append({
-                'text': heading['text'],
-                'page_num': heading['page_num'],
-                'y': heading['y']
-            })
-        
-        # Get the semantic matches with scores
-        semantic_matches = match_to_job_query(candidates, job_query)
+        # The matcher only reads text/page_num/y, so the merged headings can be
+        # passed as they are; each match's "index" points straight back at them
+        semantic_matches = match_to_job_query(headings, job_query)
         
         # Add the semantic scores back to the original headings
         scored_headings = []
         for match in semantic_matches:
-            # Find the original heading that matches this semantic result
-            for heading in headings:
-                if (heading['text'] == match['text'] and 
-                    heading['page_num'] == match['page_num'] and 
-                    abs(heading['y'] - match['y']) < 1):
-                    # Create a new heading with the score added
-                    scored_heading = heading.copy()
-                    scored_heading['score'] = match['score']
-                    scored_headings.append(scored_heading)
-                    break
+            # Create a new heading with the score added
+            scored_heading = headings[match['index']].copy()
+            scored_heading['score'] = match['score']
+            scored_headings.append(scored_heading)
         
         return scored_headings
 
@@ -441,7 +333,7 @@ def extract_heading_candidates_from_doc(doc):
     all_lines = []
 
     for page_num, page in enumerate(doc):
-        blocks = page.get_text("dict")["blocks"]
+        blocks = page.get_text("dict", flags=text_flags())["blocks"]
         spans = []
 
         for block in blocks:
@@ -583,7 +475,7 @@ def extract_sections_from_headings(pdf_path, heading_matches):
         section_text = ""
         for p in range(start_page, end_page + 1):
             page = doc[p]
-            blocks = page.get_text("dict")["blocks"]
+            blocks = page.get_text("dict", flags=text_flags())["blocks"]
             for block in blocks:
                 for line in block.get("lines", []):
                     line_y = line["bbox"][1]
@@ -0,0 +1,177 @@
+import re
+
+import numpy as np
+
+from .text_utils import clean_text, is_all_upper, is_binary_data, is_bold_font_name, is_title_case
+
+# Heading reasons, one bit each, so candidates carry a single int instead of strings
+REASON_LARGER_FONT = 1
+REASON_BOLD = 2
+REASON_ITALIC = 4
+REASON_CENTERED_SHORT = 8
+REASON_ALL_UPPER = 16
+REASON_TITLE_CASE = 32
+REASON_SHORT_PROMINENT = 64
+
+REASON_NAMES = (
+    (REASON_LARGER_FONT, "Larger font size"),
+    (REASON_BOLD, "Bold font"),
+    (REASON_ITALIC, "Italic font"),
+    (REASON_CENTERED_SHORT, "Center aligned (short line)"),
+    (REASON_ALL_UPPER, "All uppercase"),
+    (REASON_TITLE_CASE, "Title case"),
+    (REASON_SHORT_PROMINENT, "Short & prominent"),
+)
+
+_SENTENCE_END = re.compile(r"[.?!]$")
+
+
+def describe_reasons(mask):
+    """Return the human-readable reasons encoded in a reason bitmask"""
+    return [name for bit, name in REASON_NAMES if mask & bit]
+
+
+def merge_span_lines(parsed, max_lines=None):
+    """Join each page's spans into sentence-like lines
+
+    Spans are visited by (rounded line y, x0) and merged until a sentence end
+    or a vertical jump larger than 1.2x the font size. Returns (texts, sizes,
+    span_ids), where span_ids is the span table row of each line's last span.
+    Stops before a page once more than max_lines lines have been collected.
+    """
+    texts, sizes, span_ids = [], [], []
+    span_text = parsed.span_text
+    span_size = parsed.span_size.tolist()
+    span_x0 = parsed.span_bbox[:, 0].tolist()
+    span_origin_y = parsed.line_bbox[parsed.span_line, 1].tolist()
+
+    for page in parsed.pages:
+        if max_lines is not None and len(texts) > max_lines:
+            break
+        start, end = page.span_range()
+        rounded_y = {i: round(span_origin_y[i], 1) for i in range(start, end)}
+        order = sorted(range(start, end), key=lambda i: (rounded_y[i], span_x0[i]))
+
+        buffer = ""
+        last_y = None
+        last_size = None
+        last_span = None
+        for i in order:
+            raw_text = span_text[i]
+            if is_binary_data(raw_text):
+                continue
+            text = clean_text(raw_text)
+            if not text:
+                continue
+
+            current_y = rounded_y[i]
+            size = span_size[i]
+            is_new_para = last_y is not None and abs(current_y - last_y) > size * 1.2
+
+            if buffer and (_SENTENCE_END.search(buffer) or is_new_para):
+                texts.append(buffer.strip())
+                sizes.append(last_size)
+                span_ids.append(last_span)
+                buffer = text
+            else:
+                buffer = buffer + " " + text if buffer else text
+
+            last_y = current_y
+            last_size = size
+            last_span = i
+
+        if buffer:
+            texts.append(buffer.strip())
+            sizes.append(last_size)
+            span_ids.append(last_span)
+
+    return texts, sizes, span_ids
+
+
+def _most_common_first(values):
+    """Mode of values; ties go to the value seen first, as Counter.most_common does"""
+    uniques, first_index, counts = np.unique(values, return_index=True, return_counts=True)
+    best = counts == counts.max()
+    return uniques[best][np.argmin(first_index[best])]
+
+
+def heading_reason_masks(parsed, texts, sizes, span_ids):
+    """Score merged lines with vectorised heading rules
+
+    Returns a dict of per-line columns (reason_mask, bold, italic, centered,
+    words, width, page_num, y, x0). A line is a heading candidate when its
+    reason_mask is non-zero.
+    """
+    span_ids = np.asarray(span_ids, dtype=np.int64)
+    sizes = np.asarray(sizes, dtype=np.float64)
+    x0 = parsed.span_bbox[span_ids, 0]
+    x1 = parsed.span_bbox[span_ids, 2]
+    flags = parsed.span_flags[span_ids]
+    page_num = parsed.span_page[span_ids]
+    page_width = parsed.page_width[page_num]
+
+    text_width = x1 - x0
+    threshold_width = 0.75 * _most_common_first(np.round(text_width, -1))
+    median_font_size = np.sort(sizes)[len(sizes) // 2]
+
+    bold_fonts = np.array([is_bold_font_name(font) for font in parsed.fonts] or [False])
+    is_bold = ((flags & 2) != 0) | bold_fonts[parsed.span_font[span_ids]]
+    is_italic = (flags & 1) != 0
+    is_centered = np.abs(x0 - (page_width - x1)) < 20
+    word_count = np.array([len(text.split()) for text in texts], dtype=np.int64)
+    all_upper = np.array([is_all_upper(text) for text in texts], dtype=bool)
+    title_case = np.array([is_title_case(text) for text in texts], dtype=bool)
+    short = word_count < 10
+
+    mask = np.zeros(len(texts), dtype=np.int32)
+    mask[sizes > median_font_size * 1.15] |= REASON_LARGER_FONT
+    mask[is_bold] |= REASON_BOLD
+    mask[is_italic] |= REASON_ITALIC
+    mask[is_centered & ((text_width < threshold_width) | short)] |= REASON_CENTERED_SHORT
+    mask[all_upper] |= REASON_ALL_UPPER
+    mask[title_case] |= REASON_TITLE_CASE
+    mask[short & (sizes > median_font_size)] |= REASON_SHORT_PROMINENT
+
+    return {
+        "reason_mask": mask,
+        "bold": is_bold,
+        "italic": is_italic,
+        "centered": is_centered,
+        "words": word_count,
+        "width": text_width,
+        "page_num": page_num,
+        "y": parsed.span_bbox[span_ids, 1],
+        "x0": x0,
+    }
+
+
+def find_heading_candidates(parsed, max_lines=None):
+    """Return heading candidate dicts for a ParsedDocument
+
+    Only lines with at least one reason are materialised as dicts; the
+    per-line scoring itself runs on NumPy columns.
+    """
+    texts, sizes, span_ids = merge_span_lines(parsed, max_lines=max_lines)
+    if not texts:
+        return []
+
+    columns = heading_reason_masks(parsed, texts, sizes, span_ids)
+    rows = np.flatnonzero(columns["reason_mask"])
+    picked = {key: values[rows].tolist() for key, values in columns.items()}
+
+    candidates = []
+    for j, i in enumerate(rows.tolist()):
+        candidates.append({
+            "text": texts[i],
+            "size": sizes[i],
+            "bold": picked["bold"][j],
+            "italic": picked["italic"][j],
+            "centered": picked["centered"][j],
+            "words": picked["words"][j],
+            "width": picked["width"][j],
+            "reason_mask": picked["reason_mask"][j],
+            "page_num": picked["page_num"][j],
+            "y": picked["y"][j],
+            "x0": picked["x0"][j],
+        })
+    return candidates
@@ -0,0 +1,52 @@
+import hashlib
+import json
+import os
+
+from .disk_cache import DiskCache, file_sha256
+
+
+def document_hash(doc):
+    """Content hash of an open fitz.Document (file bytes when it came from disk)"""
+    if doc.name and os.path.isfile(doc.name):
+        return file_sha256(doc.name)
+    return hashlib.sha256(doc.tobytes()).hexdigest()
+
+
+class LayoutCache:
+    """Persistent per-page PP-DocLayout heading boxes, LRU-evicted by size
+
+    Entries are keyed by (PDF content hash, page index, render DPI, model id),
+    so an unchanged document rendered the same way never hits the model twice.
+    """
+
+    def __init__(self, path, max_mb=64):
+        self.store = DiskCache(path, max_bytes=int(max_mb * 1024 * 1024), table="layout_boxes")
+
+    @staticmethod
+    def _key(content_hash, page_num, dpi, model_id):
+        return f"{content_hash}:{page_num}:{dpi}:{model_id}"
+
+    def get_pages(self, content_hash, page_numbers, dpi, model_id):
+        """Return {page_num: heading_boxes} for every cached page"""
+        keys = {self._key(content_hash, p, dpi, model_id): p for p in page_numbers}
+        found = self.store.get_many(keys)
+        return {keys[key]: json.loads(value) for key, value in found.items()}
+
+    def put_pages(self, content_hash, boxes_by_page, dpi, model_id):
+        """Store the heading boxes detected on each page (an empty list is cached too)"""
+        items = {}
+        for page_num, boxes in boxes_by_page.items():
+            plain = [
+                {
+                    'bbox': [float(v) for v in box['bbox']],
+                    'confidence': float(box['confidence']),
+                    'type': box['type'],
+                    'page_num': page_num
+                }
+                for box in boxes
+            ]
+            items[self._key(content_hash, page_num, dpi, model_id)] = json.dumps(plain).encode("utf-8")
+        self.store.put_many(items)
+
+    def stats(self):
+        return self.store.stats()
@@ -0,0 +1,252 @@
+import queue
+import threading
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from .heading_features import REASON_BOLD, REASON_LARGER_FONT
+from .text_utils import is_binary_data
+
+LAYOUT_DPI = 150  # 150 DPI for speed
+HEADING_LABELS = ('paragraph_title', 'doc_title')
+
+_DONE = object()
+
+
+def pixmap_to_array(pix):
+    """View a pixmap's sample buffer as an HxWxN uint8 array without copying
+
+    The array borrows the pixmap's memory, so the pixmap must stay alive for
+    as long as the array is used.
+    """
+    return np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+
+
+def render_page_array(page, dpi=LAYOUT_DPI):
+    """Render a page straight to the BGR array PP-DocLayout expects
+
+    Replaces the old PNG round trip: the pixmap buffer is wrapped in place and
+    the only copy is the RGB -> BGR channel swap that cv2.imread used to do.
+    """
+    pix = page.get_pixmap(dpi=dpi, alpha=False)
+    rgb = pixmap_to_array(pix)
+    return np.ascontiguousarray(rgb[:, :, ::-1])
+
+
+def heading_boxes_from_results(results, page_num):
+    """Pick the heading-related boxes out of a LayoutDetection result list"""
+    heading_boxes = []
+    for result in results:
+        for box in result.get('boxes', []):
+            label = box.get('label', '')
+            if label in HEADING_LABELS:
+                heading_boxes.append({
+                    'bbox': box['coordinate'],  # [x0, y0, x1, y1]
+                    'confidence': box['score'],
+                    'type': label,
+                    'page_num': page_num
+                })
+    return heading_boxes
+
+
+class PageWordIndex:
+    """A page's words, binary-filtered once and sorted by top edge
+
+    Lets each detected box look only at the words in its vertical band instead
+    of rescanning (and re-validating) every word on the page.
+    """
+
+    def __init__(self, words):
+        entries = sorted(
+            (word[1], order, word) for order, word in enumerate(words)
+            if not is_binary_data(word[4])
+        )
+        self._tops = [entry[0] for entry in entries]
+        self._entries = [(order, word) for _, order, word in entries]
+
+    def words_in_box(self, bbox, tolerance=5):
+        """Return (x0, text) for words inside bbox (plus tolerance), sorted by x
+
+        Words sharing an x0 keep their page order, as a stable sort of the
+        page's word list would.
+        """
+        x0, y0, x1, y1 = bbox
+        # A word inside the box has y0 >= box top and y0 <= y1 <= box bottom
+        lo = bisect_left(self._tops, y0 - tolerance)
+        hi = bisect_right(self._tops, y1 + tolerance)
+        matches = []
+        for order, word in self._entries[lo:hi]:
+            wx0, wy0, wx1, wy1, text = word[:5]
+            if wx0 >= x0 - tolerance and wx1 <= x1 + tolerance and wy1 <= y1 + tolerance:
+                matches.append((wx0, order, text))
+        matches.sort()
+        return [(wx0, text) for wx0, _, text in matches]
+
+
+def headings_near(layout_headings, heuristic_headings, max_dy=20):
+    """Return indices of heuristic headings within max_dy of a layout heading on the same page
+
+    Heuristic headings are bucketed per page and sorted by y, so each layout
+    heading bisects to its +/- max_dy window instead of scanning the whole
+    document: O((L + H) log H) rather than O(L * H).
+    """
+    by_page = {}
+    for i, heading in enumerate(heuristic_headings):
+        by_page.setdefault(heading['page_num'], []).append((heading['y'], i))
+
+    page_index = {}
+    for page_num, entries in by_page.items():
+        entries.sort()
+        page_index[page_num] = ([y for y, _ in entries], [i for _, i in entries])
+
+    near = set()
+    for layout_heading in layout_headings:
+        index = page_index.get(layout_heading['page_num'])
+        if index is None:
+            continue
+        ys, indices = index
+        ly = layout_heading['y']
+        lo = bisect_left(ys, ly - max_dy)
+        hi = bisect_right(ys, ly + max_dy)
+        for pos in range(lo, hi):
+            # Re-check exactly so float edge cases match abs(dy) < max_dy
+            if abs(ly - ys[pos]) < max_dy:
+                near.add(indices[pos])
+    return near
+
+
+def _render_worker(doc, page_numbers, dpi, text_flags, out_queue, stop_event):
+    """Producer: render pages (and grab their words) ahead of inference
+
+    Within the pipeline only this thread calls into the fitz document, so the
+    inference side never touches PyMuPDF (other callers may still read doc
+    concurrently, e.g. the heuristic thread in HybridHeadingExtractor's "all"
+    mode). A page that fails to load or render is queued as
+    (page_num, None, error message) and the remaining pages carry on.
+    """
+    def put(item):
+        while not stop_event.is_set():
+            try:
+                out_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    for page_num in page_numbers:
+        try:
+            page = doc[page_num]
+            words = page.get_text("words", flags=text_flags)
+            item = (page_num, render_page_array(page, dpi=dpi), words)
+        except Exception as e:
+            item = (page_num, None, str(e))
+        if not put(item):
+            return
+    put(_DONE)
+
+
+def run_layout_pipeline(doc, layout_model, page_numbers=None, batch_size=4, prefetch=8,
+                        dpi=LAYOUT_DPI, text_flags=None):
+    """Yield (page_num, heading_boxes, words) for each page, in page order
+
+    A render thread fills a bounded queue of page images while this generator
+    runs layout inference on batches of up to batch_size pages, so rasterising
+    the next pages overlaps inference on the current batch. heading_boxes is
+    None for a page that failed to render or whose batch failed to predict;
+    either way only those pages are skipped. text_flags is passed to
+    get_text("words") (None keeps PyMuPDF's defaults).
+    """
+    if page_numbers is None:
+        page_numbers = range(len(doc))
+    page_numbers = list(page_numbers)
+    if not page_numbers:
+        return
+
+    batch_size = max(1, batch_size)
+    pages_queue = queue.Queue(maxsize=max(prefetch, batch_size))
+    stop_event = threading.Event()
+    producer = threading.Thread(
+        target=_render_worker,
+        args=(doc, page_numbers, dpi, text_flags, pages_queue, stop_event),
+        daemon=True,
+    )
+    producer.start()
+
+    try:
+        finished = False
+        while not finished:
+            batch = []
+            while len(batch) < batch_size:
+                item = pages_queue.get()
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+            if not batch:
+                break
+
+            # Pages that failed to render are passed through without inference
+            rendered_pages = [page_num for page_num, image, _ in batch if image is not None]
+            images = [image for _, image, _ in batch if image is not None]
+            results = []
+            if images:
+                try:
+                    results = list(layout_model.predict(images, batch_size=len(images)))
+                except Exception as e:
+                    print(f"        ❌ Layout detection failed for pages {rendered_pages}: {e}")
+                    results = None
+
+            rendered = 0
+            for page_num, image, words in batch:
+                boxes = None
+                if image is None:
+                    print(f"        ❌ Rendering failed for page {page_num}: {words}")
+                    words = []
+                else:
+                    if results is not None and rendered < len(results):
+                        boxes = heading_boxes_from_results([results[rendered]], page_num)
+                    rendered += 1
+                yield page_num, boxes, words
+    finally:
+        stop_event.set()
+        producer.join()
+
+
+def select_layout_pages(parsed, heuristic_headings, min_confident=1, min_size_spread=1.15):
+    """Pick the pages where layout detection is still worth running
+
+    A page is skipped when it has no text layer (layout boxes are read back from
+    the PDF words, so an image-only page can never yield a heading), or when the
+    heuristics already found at least min_confident "larger font + bold" headings
+    on a page whose font sizes actually vary (max/min >= min_size_spread), i.e.
+    the size signal they rely on is meaningful there. Every other page is sent to
+    the layout model. Returns (page_numbers, stats).
+    """
+    confident_mask = REASON_LARGER_FONT | REASON_BOLD
+    confident = {}
+    for heading in heuristic_headings:
+        if heading.get('reason_mask', 0) & confident_mask == confident_mask:
+            confident[heading['page_num']] = confident.get(heading['page_num'], 0) + 1
+
+    layout_pages = []
+    skipped_confident = 0
+    skipped_image_only = 0
+    for page in parsed.pages:
+        sizes = parsed.line_size[page.line_start:page.line_end]
+        sizes = sizes[sizes > 0]
+        if not len(sizes):
+            skipped_image_only += 1
+            continue
+        spread = sizes.max() / sizes.min()
+        if confident.get(page.page_num, 0) >= min_confident and spread >= min_size_spread:
+            skipped_confident += 1
+            continue
+        layout_pages.append(page.page_num)
+
+    stats = {
+        "pages": parsed.page_count,
+        "layout_pages": len(layout_pages),
+        "skipped_confident": skipped_confident,
+        "skipped_image_only": skipped_image_only,
+    }
+    return layout_pages, stats
@@ -0,0 +1,134 @@
+import os
+import threading
+
+DEFAULT_MODEL_NAME = "intfloat/e5-small-v2"
+DEFAULT_CACHE_DIR = "/app/models/sentence-transformers"
+DEFAULT_ONNX_DIR = "/app/models/onnx"
+BACKENDS = ("torch", "onnx")
+
+_models = {}
+_registry_lock = threading.Lock()
+_key_locks = {}
+
+
+def _registry_key(model_name, device, cache_dir, backend="torch", quantize=True, threads=None,
+                  onnx_dir=None, max_seq_length=None):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}, use one of {', '.join(BACKENDS)}")
+    if backend == "torch":
+        return (model_name, device, cache_dir or DEFAULT_CACHE_DIR, backend, None, threads, None,
+                max_seq_length)
+    return (model_name, device, cache_dir or DEFAULT_CACHE_DIR, backend, bool(quantize), threads,
+            onnx_dir or DEFAULT_ONNX_DIR, max_seq_length)
+
+
+def _load_model(model_name, device, cache_dir, backend="torch", quantize=True, threads=None,
+                onnx_dir=None, max_seq_length=None):
+    """Load the encoder for a registry key"""
+    model = None
+    if backend == "onnx":
+        from .onnx_encoder import ONNXRUNTIME_AVAILABLE
+        if ONNXRUNTIME_AVAILABLE:
+            model = _load_onnx_model(model_name, cache_dir, quantize, threads, onnx_dir)
+        else:
+            print("Warning: onnxruntime not available. Using the torch encoder.")
+    if model is None:
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        model = _load_sentence_transformer(model_name, device, cache_dir)
+
+    if max_seq_length and max_seq_length < model.max_seq_length:
+        # Truncating changes the vectors of long texts, so cache them under their own name
+        model.cache_name = f"{getattr(model, 'cache_name', model_name)}:max{max_seq_length}"
+        model.max_seq_length = max_seq_length
+    return model
+
+
+def _load_onnx_model(model_name, cache_dir, quantize, threads, onnx_dir):
+    """Load the ONNX Runtime encoder, exporting the sentence model first if needed"""
+    from .onnx_encoder import OnnxEncoder, export_onnx, is_exported, onnx_model_dir, quantize_onnx
+
+    model_dir = onnx_model_dir(onnx_dir, model_name)
+    if not is_exported(model_dir, quantized=False):
+        print(f"Exporting {model_name} to ONNX in {model_dir}")
+        export_onnx(_load_sentence_transformer(model_name, "cpu", cache_dir), model_dir)
+    if quantize and not is_exported(model_dir, quantized=True):
+        print(f"Quantizing {model_name} to int8")
+        quantize_onnx(model_dir)
+    print(f"Loading model {model_name} with ONNX Runtime ({'int8' if quantize else 'float32'})")
+    return OnnxEncoder(model_dir, model_name, quantized=quantize, threads=threads)
+
+
+def _load_sentence_transformer(model_name, device, cache_dir):
+    """Load a SentenceTransformer, preferring the offline cache when it exists"""
+    from sentence_transformers import SentenceTransformer
+
+    model_cache_path = os.path.join(cache_dir, f"models--{model_name.replace('/', '--')}")
+
+    if os.path.exists(model_cache_path):
+        # Model exists in cache, load it offline
+        print(f"Loading model {model_name} from cache (offline mode)")
+        os.environ['SENTENCE_TRANSFORMERS_HOME'] = cache_dir
+        os.environ['HF_HUB_OFFLINE'] = '1'  # Force offline mode
+        return SentenceTransformer(model_name, device=device, cache_folder=cache_dir)
+
+    # Fallback to default behavior for local development
+    print(f"Loading model {model_name} from Hugging Face (online mode)")
+    return SentenceTransformer(model_name, device=device)
+
+
+def get_model(model_name=DEFAULT_MODEL_NAME, device=None, cache_dir=None, backend="torch",
+              quantize=True, threads=None, onnx_dir=None, max_seq_length=None):
+    """Return the process-wide model for this key, loading it on first use
+
+    backend "onnx" runs an exported copy of the model with ONNX Runtime
+    (int8 dynamically quantized unless quantize=False), exporting it into
+    onnx_dir on first use; threads sets the intra-op thread count.
+    max_seq_length lowers the model's token limit (e.g. for short headings).
+    """
+    key = _registry_key(model_name, device, cache_dir, backend, quantize, threads, onnx_dir,
+                        max_seq_length)
+
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    # One lock per key so two different models can load concurrently,
+    # while callers asking for the same model wait for a single load.
+    with _registry_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        model = _models.get(key)
+        if model is None:
+            model = _load_model(*key)
+            _models[key] = model
+    return model
+
+
+def get_loaded_model(model_name=DEFAULT_MODEL_NAME, device=None, cache_dir=None,
+                     backend="torch", quantize=True, threads=None, onnx_dir=None,
+                     max_seq_length=None):
+    """Return the model if it has already been loaded, otherwise None"""
+    return _models.get(_registry_key(model_name, device, cache_dir, backend, quantize, threads,
+                                     onnx_dir, max_seq_length))
+
+
+def warm_up(model_name=DEFAULT_MODEL_NAME, device=None, cache_dir=None, **backend_options):
+    """Load the model ahead of time and run a tiny encode to initialise it"""
+    model = get_model(model_name, device=device, cache_dir=cache_dir, **backend_options)
+    model.encode(["warm up"], show_progress_bar=False)
+    return model
+
+
+def loaded_models():
+    """List the keys of every model currently held by the registry"""
+    return list(_models.keys())
+
+
+def clear_models():
+    """Drop all loaded models (mainly useful for tests and long-lived services)"""
+    with _registry_lock:
+        _models.clear()
+        _key_locks.clear()
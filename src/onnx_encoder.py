@@ -0,0 +1,171 @@
+import json
+import os
+
+import numpy as np
+
+# ONNX Runtime is optional; without it the registry falls back to the torch encoder
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+SETTINGS_FILE = "encoder.json"
+
+
+def onnx_model_dir(root, model_name):
+    """Directory holding the exported files of model_name under root"""
+    return os.path.join(root, model_name.replace("/", "--"))
+
+
+def is_exported(model_dir, quantized=True):
+    model_file = QUANTIZED_MODEL_FILE if quantized else MODEL_FILE
+    return all(os.path.exists(os.path.join(model_dir, name))
+               for name in (model_file, TOKENIZER_FILE, SETTINGS_FILE))
+
+
+def export_onnx(sentence_model, model_dir, opset=14):
+    """Export a mean-pooling SentenceTransformer to model_dir for OnnxEncoder
+
+    Writes the transformer as model.onnx (dynamic batch and sequence axes),
+    its fast tokenizer as tokenizer.json, and encoder.json with the
+    tokenization and pooling settings.
+    """
+    import inspect
+
+    import torch
+
+    transformer, pooling = sentence_model[0], sentence_model[1]
+    # sentence-transformers 2.x flags the mode, later versions name it
+    if not (getattr(pooling, "pooling_mode_mean_tokens", False)
+            or getattr(pooling, "pooling_mode", None) == "mean"):
+        raise ValueError("Only mean-pooling sentence models can be exported to ONNX")
+    tokenizer = transformer.tokenizer
+    if not getattr(tokenizer, "is_fast", False):
+        raise ValueError("Exporting to ONNX needs a model with a fast (tokenizer.json) tokenizer")
+    os.makedirs(model_dir, exist_ok=True)
+
+    sample = tokenizer(["export sample text"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids")
+                   if name in sample]
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"}
+                    for name in input_names + ["last_hidden_state"]}
+    export_kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        export_kwargs["dynamo"] = False  # the TorchScript exporter handles dynamic_axes
+    with torch.no_grad():
+        torch.onnx.export(LastHiddenState(transformer.auto_model.eval()),
+                          tuple(sample[name] for name in input_names),
+                          os.path.join(model_dir, MODEL_FILE),
+                          input_names=input_names, output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic_axes, opset_version=opset, **export_kwargs)
+
+    tokenizer.backend_tokenizer.save(os.path.join(model_dir, TOKENIZER_FILE))
+    normalize = any(type(module).__name__ == "Normalize" for module in sentence_model)
+    with open(os.path.join(model_dir, SETTINGS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"max_seq_length": sentence_model.max_seq_length,
+                   "do_lower_case": getattr(transformer, "do_lower_case", False),
+                   "pad_token": tokenizer.pad_token, "pad_token_id": tokenizer.pad_token_id,
+                   "normalize": normalize}, f, indent=2)
+    return model_dir
+
+
+def quantize_onnx(model_dir):
+    """Write model_int8.onnx, model.onnx with int8 dynamically quantized weights"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(os.path.join(model_dir, MODEL_FILE),
+                     os.path.join(model_dir, QUANTIZED_MODEL_FILE), weight_type=QuantType.QInt8)
+
+
+class OnnxEncoder:
+    """CPU sentence encoder running an exported transformer with ONNX Runtime
+
+    Mirrors the parts of SentenceTransformer.encode the pipeline uses: texts
+    are stripped, batched longest first and tokenized up to max_seq_length,
+    token embeddings are mean-pooled over the attention mask and, if the
+    source model did so, L2-normalised. Only onnxruntime and tokenizers are
+    imported, not torch or transformers. cache_name tells the embedding caches
+    apart from the torch encoder's, since the vectors differ slightly.
+    """
+
+    def __init__(self, model_dir, model_name, quantized=True, threads=None):
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, SETTINGS_FILE), "r", encoding="utf-8") as f:
+            settings = json.load(f)
+        self.do_lower_case = settings.get("do_lower_case", False)
+        self.normalize = settings.get("normalize", False)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.max_seq_length = settings["max_seq_length"]
+        self.tokenizer.enable_padding(pad_id=settings["pad_token_id"],
+                                      pad_token=settings["pad_token"])
+        self.cache_name = f"{model_name}:onnx{'-int8' if quantized else ''}"
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        model_file = QUANTIZED_MODEL_FILE if quantized else MODEL_FILE
+        self.session = ort.InferenceSession(os.path.join(model_dir, model_file), options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    @property
+    def max_seq_length(self):
+        return self.tokenizer.truncation["max_length"]
+
+    @max_seq_length.setter
+    def max_seq_length(self, value):
+        self.tokenizer.enable_truncation(max_length=value)
+
+    def _prepare(self, sentences):
+        texts = [str(text).strip() for text in sentences]
+        return [text.lower() for text in texts] if self.do_lower_case else texts
+
+    def token_lengths(self, sentences):
+        """Tokens per text as encode() will see them (truncated to max_seq_length)"""
+        encodings = self.tokenizer.encode_batch(self._prepare(sentences))
+        return [sum(encoding.attention_mask) for encoding in encodings]
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        columns = {"input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                   "attention_mask": mask,
+                   "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)}
+        hidden = self.session.run(None, {name: columns[name] for name in self.input_names})[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.normalize:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, show_progress_bar=False):
+        """Return a (len(sentences), dim) float32 array (a vector for a single string)"""
+        single = isinstance(sentences, str)
+        texts = self._prepare([sentences] if single else sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Longest first, as SentenceTransformer does, so batches pad little
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        encoded = np.concatenate([
+            self._encode_batch([texts[i] for i in order[start:start + batch_size]])
+            for start in range(0, len(texts), batch_size)
+        ])
+        embeddings = np.empty_like(encoded)
+        embeddings[order] = encoded
+        return embeddings[0] if single else embeddings
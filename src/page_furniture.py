@@ -0,0 +1,71 @@
+import re
+from collections import defaultdict
+
+# Running headers and footers sit in these top / bottom fractions of the page
+MARGIN_BAND = 0.08
+# Occurrences of a line whose y (as a fraction of page height) differ by less
+# than this count as the same position
+POSITION_TOLERANCE = 0.015
+# A line must repeat on this many pages before it is treated as page furniture
+MIN_PAGES = 3
+
+_DIGITS = re.compile(r"\d+")
+_SPACE = re.compile(r"\s+")
+
+
+def furniture_key(text):
+    """Normalise a line so page numbers and spacing variants compare equal
+
+    "Page 3 of 12" and "page 4 of  12" both become "page # of #".
+    """
+    return _SPACE.sub(" ", _DIGITS.sub("#", text)).strip().casefold()
+
+
+def repeated_positions(candidates, page_heights, min_pages=MIN_PAGES):
+    """Return groups of candidate indices that are running headers or footers
+
+    A group is one normalised text in the top or bottom margin band, at the
+    same relative height (within POSITION_TOLERANCE) on at least min_pages
+    distinct pages. Indices in each group follow candidate order.
+    """
+    by_key = defaultdict(list)
+    for i, c in enumerate(candidates):
+        position = c["y"] / max(float(page_heights[c["page_num"]]), 1.0)
+        if MARGIN_BAND <= position <= 1 - MARGIN_BAND:
+            continue
+        by_key[furniture_key(c["text"])].append((position, i))
+
+    groups = []
+    for occurrences in by_key.values():
+        if len(occurrences) < min_pages:
+            continue
+        # Chain occurrences sorted by height into runs at the same position
+        occurrences.sort()
+        run = [occurrences[0]]
+        for occurrence in occurrences[1:] + [(float("inf"), -1)]:
+            if occurrence[0] - run[-1][0] <= POSITION_TOLERANCE:
+                run.append(occurrence)
+                continue
+            indices = sorted(i for _, i in run)
+            if len({candidates[i]["page_num"] for i in indices}) >= min_pages:
+                groups.append(indices)
+            run = [occurrence]
+    return groups
+
+
+def collapse_repeated_candidates(candidates, page_heights, min_pages=MIN_PAGES):
+    """Drop all but the first occurrence of every running header / footer
+
+    page_heights is indexed by page number (ParsedDocument.page_height, or
+    the page rects of a fitz document). Returns (kept candidates in their
+    original order, stats) where stats counts the "groups" found, the
+    "candidates" removed and the distinct "texts" that no longer need
+    encoding because every occurrence of them was removed.
+    """
+    groups = repeated_positions(candidates, page_heights, min_pages)
+    removed = {i for indices in groups for i in indices[1:]}
+    kept = [c for i, c in enumerate(candidates) if i not in removed]
+    kept_texts = {c["text"] for c in kept}
+    removed_texts = {candidates[i]["text"] for i in removed} - kept_texts
+    stats = {"groups": len(groups), "candidates": len(removed), "texts": len(removed_texts)}
+    return kept, stats
@@ -0,0 +1,167 @@
+import mmap
+import tempfile
+
+import numpy as np
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+# Rows upcast per matrix product while scanning the compressed codes; small
+# enough for the float32 buffer to stay in cache
+_SCAN_CHUNK = 256
+
+# Added to every error bound to absorb float32 rounding in the scan itself
+_BOUND_SLACK = 1e-5
+
+
+def process_rss_bytes():
+    """Return (resident bytes, of which file-backed) for this process
+
+    File-backed pages (e.g. the memory-mapped float32 originals) are clean
+    page cache the OS can evict; the rest is private memory. Reads Linux
+    /proc; elsewhere returns the peak RSS and 0.
+    """
+    try:
+        fields = {}
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                fields[name] = value
+        return (int(fields["VmRSS"].split()[0]) * 1024,
+                int(fields.get("RssFile", "0 kB").split()[0]) * 1024)
+    except (OSError, KeyError, ValueError):
+        import resource
+        # ru_maxrss is in KiB on Linux and bytes on macOS; this fallback is only a rough guide
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, 0
+
+
+def _quantize(vectors, dtype):
+    """Return (codes, per-row scales, per-row error norms) for unit-normalised rows"""
+    if dtype == "float16":
+        codes = vectors.astype(np.float16)
+        scales = np.ones(len(vectors), dtype=np.float32)
+    else:
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-8) / 127
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    errors = np.linalg.norm(vectors - codes.astype(np.float32) * scales[:, None], axis=1)
+    return codes, scales.astype(np.float32), errors.astype(np.float32)
+
+
+class QuantizedEmbeddings:
+    """Corpus embeddings kept compressed in RAM and re-scored exactly on a shortlist
+
+    Each document's rows are unit-normalised and stored as int8 codes (one
+    scale per row) or float16, along with the norm of each row's quantisation
+    error, which bounds how far its approximate cosine can be from the exact
+    one. The float32 originals go to a memory-mapped file (refine_path, or an
+    anonymous temporary file) and only the rows that can still reach a
+    document's top-k are read back and re-scored, so rankings match exact
+    scoring.
+    """
+
+    def __init__(self, embeddings_by_doc, dtype="int8", refine_path=None):
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unsupported embedding storage {dtype!r}, use float16 or int8")
+        self.dtype = dtype
+        self.docs = [doc for doc, embeddings in embeddings_by_doc.items() if len(embeddings)]
+        self.offsets = np.cumsum([0] + [len(embeddings_by_doc[doc]) for doc in self.docs])
+        self.doc_slots = {doc: slot for slot, doc in enumerate(self.docs)}
+        rows = int(self.offsets[-1])
+        dim = embeddings_by_doc[self.docs[0]].shape[1] if self.docs else 0
+
+        self.codes = np.zeros((rows, dim), dtype=np.int8 if dtype == "int8" else np.float16)
+        self.scales = np.zeros(rows, dtype=np.float32)
+        self.errors = np.zeros(rows, dtype=np.float32)
+        self.norms = np.zeros(rows, dtype=np.float32)
+        self._refine_file = None
+        if rows:
+            if refine_path is None:
+                self._refine_file = tempfile.TemporaryFile()
+            self.exact = np.memmap(self._refine_file or refine_path, dtype=np.float32,
+                                   mode="w+", shape=(rows, dim))
+        else:
+            self.exact = np.zeros((0, dim), dtype=np.float32)
+
+        for slot, doc in enumerate(self.docs):
+            start, end = self.offsets[slot], self.offsets[slot + 1]
+            embeddings = np.asarray(embeddings_by_doc[doc], dtype=np.float32)
+            self.exact[start:end] = embeddings
+            self.norms[start:end] = np.maximum(np.linalg.norm(embeddings, axis=1), 1e-8)
+            self.codes[start:end], self.scales[start:end], self.errors[start:end] = _quantize(
+                embeddings / self.norms[start:end, None], dtype
+            )
+        if rows:
+            self.exact.flush()
+            # The written pages are on disk now; drop them from this process's resident set
+            # (re-scoring faults back in only the rows it reads)
+            mapping = getattr(self.exact, "_mmap", None)
+            if mapping is not None and hasattr(mmap, "MADV_DONTNEED"):
+                mapping.madvise(mmap.MADV_DONTNEED)
+                # Re-scoring reads scattered rows; read-ahead would only pull in their neighbours
+                mapping.madvise(mmap.MADV_RANDOM)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        """Bytes held in RAM (the float32 originals are on disk)"""
+        return self.codes.nbytes + self.scales.nbytes + self.errors.nbytes + self.norms.nbytes
+
+    @property
+    def float32_nbytes(self):
+        return self.exact.nbytes
+
+    def doc_embeddings(self, doc):
+        """A document's float32 matrix, a view onto the memory-mapped originals"""
+        slot = self.doc_slots[doc]
+        return self.exact[self.offsets[slot]:self.offsets[slot + 1]]
+
+    def embeddings_by_doc(self):
+        """{doc: float32 matrix} views onto the memory-mapped originals"""
+        return {doc: self.doc_embeddings(doc) for doc in self.docs}
+
+    def approximate_scores(self, query_embedding):
+        """Approximate cosine of the query against every stored row"""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / max(np.linalg.norm(query), 1e-8)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        buffer = np.empty((_SCAN_CHUNK, self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(self.codes), _SCAN_CHUNK):
+            chunk = self.codes[start:start + _SCAN_CHUNK]
+            np.copyto(buffer[:len(chunk)], chunk)
+            scores[start:start + len(chunk)] = buffer[:len(chunk)] @ query
+        return scores * self.scales
+
+    def shortlist_scores(self, query_embedding, k):
+        """Return {doc: (row indices, exact cosine scores)} covering each document's top-k
+
+        A row is re-scored unless its best possible cosine is below the k-th
+        best worst-case cosine of its document.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / max(np.linalg.norm(query), 1e-8)
+        approx = self.approximate_scores(query)
+        lower = approx - self.errors - _BOUND_SLACK
+        upper = approx + self.errors + _BOUND_SLACK
+
+        # k-th best lower bound per document: sort rows by (document, -lower bound)
+        sizes = np.diff(self.offsets)
+        doc_of_row = np.repeat(np.arange(len(self.docs)), sizes)
+        order = np.argsort(doc_of_row * 4.0 - lower, kind="stable")
+        kth_lower = np.full(len(self.docs), -np.inf, dtype=np.float32)
+        full = sizes > k
+        kth_lower[full] = lower[order[self.offsets[:-1][full] + k - 1]]
+
+        rows = np.flatnonzero(upper >= kth_lower[doc_of_row])
+        # Row-by-row cosine with the row norms precomputed; within float32 rounding of
+        # semantic_matcher.cosine_scores, which breaks near-ties (see match_collection_quantized)
+        scores = np.einsum("ij,j->i", self.exact[rows], query) / self.norms[rows]
+        bounds = np.searchsorted(rows, self.offsets)
+        return {doc: (rows[bounds[slot]:bounds[slot + 1]] - self.offsets[slot],
+                      scores[bounds[slot]:bounds[slot + 1]])
+                for slot, doc in enumerate(self.docs)}
+
+    def close(self):
+        if self._refine_file is not None:
+            self._refine_file.close()
+            self._refine_file = None
@@ -1,14 +1,27 @@
+import heapq
 import json
 import os
 from datetime import datetime
 
+
+def _dumps_at(obj, level):
+    """json.dumps with indent=2, re-indented to sit `level` levels deep"""
+    text = json.dumps(obj, ensure_ascii=False, indent=2)
+    return text.replace("\n", "\n" + "  " * level)
+
+
 class Round1BFormatter:
-    def __init__(self, input_documents, persona, job_to_be_done, top_k=20):
+    def __init__(self, input_documents, persona, job_to_be_done, top_k=20, bounded=False):
         self.input_documents = input_documents
         self.persona = persona
         self.job_to_be_done = job_to_be_done
         self.top_k = top_k
+        # bounded=True keeps only the current top_k sections in a min-heap, so
+        # memory stays flat however many PDFs are added
+        self.bounded = bounded
         self.all_sections = []
+        self.total_sections = 0
+        self._heap = []
 
     def add_pdf_results(self, pdf_name, sections):
         """Add results from a single PDF"""
@@ -20,54 +33,95 @@ class Round1BFormatter:
                 'content': section['content'],
                 'page_number': section.get('page_number', 1)
             }
-            self.all_sections.append(section_with_source)
+            seq = self.total_sections
+            self.total_sections += 1
+
+            if not self.bounded:
+                self.all_sections.append(section_with_source)
+                continue
+
+            # Heap key (score, -seq): the root is the section a stable
+            # descending sort would rank last, i.e. the first to drop
+            entry = (section_with_source['score'], -seq, section_with_source)
+            if len(self._heap) < self.top_k:
+                heapq.heappush(self._heap, entry)
+            elif self._heap and entry[:2] > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, entry)
+
+    def top_sections(self):
+        """Return the top_k sections in importance order"""
+        if self.bounded:
+            ranked = sorted(self._heap, key=lambda e: (-e[0], -e[1]))
+            return [entry[2] for entry in ranked]
 
-    def save_round1b_output(self, output_folder):
-        """Generate and save Round 1B format output"""
         # Sort by score (descending) for importance ranking
         sorted_sections = sorted(self.all_sections, key=lambda x: x['score'], reverse=True)
-        
+
         # Limit to top K sections only
-        top_sections = sorted_sections[:self.top_k]
-        
-        # print(f"Limiting output to top {len(top_sections)} sections (out of {len(sorted_sections)} total)")
-
-        # Create Round 1B format
-        output = {
-            "metadata": {
-                "input_documents": self.input_documents,
-                "persona": self.persona,
-                "job_to_be_done": self.job_to_be_done,
-                "processing_timestamp": datetime.now().isoformat(),
-                "total_sections_found": len(sorted_sections),
-                "top_k_selected": len(top_sections)
-            },
-            "extracted_sections": [],
-            "subsection_analysis": []
+        return sorted_sections[:self.top_k]
+
+    def _output_parts(self):
+        """Return (metadata, extracted_sections, subsection_analysis) for the top sections"""
+        top_sections = self.top_sections()
+
+        # print(f"Limiting output to top {len(top_sections)} sections (out of {self.total_sections} total)")
+
+        metadata = {
+            "input_documents": self.input_documents,
+            "persona": self.persona,
+            "job_to_be_done": self.job_to_be_done,
+            "processing_timestamp": datetime.now().isoformat(),
+            "total_sections_found": self.total_sections,
+            "top_k_selected": len(top_sections)
         }
 
         # Add sections in importance order (only top K)
-        for idx, section in enumerate(top_sections, 1):
-            # Extracted sections
-            output["extracted_sections"].append({
+        extracted_sections = (
+            {
                 "document": section["document"],
                 "section_title": section["heading"],
                 "importance_rank": idx,
                 "page_number": section["page_number"]
-            })
-
-            # Subsection analysis
-            output["subsection_analysis"].append({
+            }
+            for idx, section in enumerate(top_sections, 1)
+        )
+        subsection_analysis = (
+            {
                 "document": section["document"],
                 "refined_text": section["content"],
                 "page_number": section["page_number"]
-            })
+            }
+            for section in top_sections
+        )
+        return metadata, extracted_sections, subsection_analysis
+
+    def build_round1b_output(self):
+        """Return the Round 1B output as a dict (what save_round1b_output writes)"""
+        metadata, extracted_sections, subsection_analysis = self._output_parts()
+        return {
+            "metadata": metadata,
+            "extracted_sections": list(extracted_sections),
+            "subsection_analysis": list(subsection_analysis)
+        }
+
+    def save_round1b_output(self, output_folder):
+        """Generate and save Round 1B format output"""
+        metadata, extracted_sections, subsection_analysis = self._output_parts()
 
-        # Save to file
+        # Stream to file entry by entry; the layout matches json.dump(indent=2)
         os.makedirs(output_folder, exist_ok=True)
         output_path = os.path.join(output_folder, "challenge1b_output.json")
         with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(output, f, ensure_ascii=False, indent=2)
+            f.write('{\n  "metadata": ' + _dumps_at(metadata, 1))
+            for key, entries in (("extracted_sections", extracted_sections),
+                                 ("subsection_analysis", subsection_analysis)):
+                f.write(f',\n  "{key}": [')
+                first = True
+                for entry in entries:
+                    f.write(("\n    " if first else ",\n    ") + _dumps_at(entry, 2))
+                    first = False
+                f.write("]" if first else "\n  ]")
+            f.write("\n}")
 
         print(f"Round 1B output saved to {output_path}")
         return output_path
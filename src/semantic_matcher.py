@@ -1,43 +1,340 @@
-from sentence_transformers import SentenceTransformer, util
-import os
+import time
 
+import numpy as np
+import torch
 
-def match_to_job_query(candidates, job_query, model_name="intfloat/e5-small-v2", top_k=5):
-    """Use semantic similarity to match heading candidates to a job query"""
-    
-    # Try to use pre-downloaded model from cache (offline mode)
-    cache_dir = "/app/models/sentence-transformers"
-    model_cache_path = os.path.join(cache_dir, f"models--{model_name.replace('/', '--')}")
-    
-    if os.path.exists(model_cache_path):
-        # Model exists in cache, load it offline
-        print(f"Loading model {model_name} from cache (offline mode)")
-        os.environ['SENTENCE_TRANSFORMERS_HOME'] = cache_dir
-        os.environ['HF_HUB_OFFLINE'] = '1'  # Force offline mode
-        model = SentenceTransformer(model_name, cache_folder=cache_dir)
+from .model_registry import DEFAULT_MODEL_NAME, get_model
+
+# Padded tokens (rows x longest row) allowed per encoder batch
+DEFAULT_TOKEN_BUDGET = 8192
+
+# Shortlist scores closer than this may be tied under exact scoring, which
+# then has to decide their order (see match_collection_quantized)
+_TIE_TOLERANCE = 1e-6
+
+# Encoder work done by this process, see encode_stats()
+_encode_totals = {"texts": 0, "batches": 0, "tokens": 0, "padded_tokens": 0, "seconds": 0.0}
+
+
+def encode_stats(reset=False):
+    """Return texts, batches, tokens, padded tokens, seconds and tokens/sec encoded so far"""
+    stats = dict(_encode_totals)
+    stats["tokens_per_second"] = stats["tokens"] / stats["seconds"] if stats["seconds"] else 0.0
+    if reset:
+        _encode_totals.update(texts=0, batches=0, tokens=0, padded_tokens=0, seconds=0.0)
+    return stats
+
+
+def token_lengths(model, texts):
+    """Tokens per text (special tokens included, truncated to max_seq_length)
+
+    Uses the encoder's own tokenizer; encoders without one get a words + 2
+    estimate.
+    """
+    if hasattr(model, "token_lengths"):
+        return np.asarray(model.token_lengths(texts), dtype=np.int64)
+    if hasattr(model, "tokenize"):
+        return np.asarray(model.tokenize(texts)["attention_mask"].sum(1), dtype=np.int64)
+    return np.array([len(text.split()) + 2 for text in texts], dtype=np.int64)
+
+
+def token_batches(lengths, token_budget):
+    """Split text indices, longest first, into batches of at most token_budget padded tokens
+
+    A batch also ends where lengths drop below three quarters of its longest
+    text, so one long heading never pads a batch full of short ones.
+    """
+    lengths = np.asarray(lengths)
+    order = np.argsort(-lengths, kind="stable")
+    batches = []
+    start = 0
+    while start < len(order):
+        # The first (longest) text sets the padded length of the whole batch
+        longest = max(int(lengths[order[start]]), 1)
+        window = -lengths[order[start:start + max(1, token_budget // longest)]]
+        end = start + max(1, int(np.searchsorted(window, -longest * 3 / 4, side="right")))
+        batches.append(order[start:end])
+        start = end
+    return batches
+
+
+def _encode_unique(texts, model, batch_size, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Encode distinct texts longest-first so each batch holds similar lengths
+
+    With a token_budget the batches are cut by padded token count instead of
+    batch_size, so short headings go through in large batches and long ones
+    in small batches.
+    """
+    start = time.perf_counter()
+    lengths = token_lengths(model, texts)
+    if token_budget:
+        batches = token_batches(lengths, token_budget)
     else:
-        # Fallback to default behavior for local development
-        print(f"Loading model {model_name} from Hugging Face (online mode)")
-        model = SentenceTransformer(model_name)
+        order = np.argsort(-np.array([len(text) for text in texts]), kind="stable")
+        batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+    encoded = [None] * len(texts)
+    for batch in batches:
+        vectors = model.encode([texts[i] for i in batch], batch_size=len(batch),
+                               convert_to_numpy=True, show_progress_bar=False)
+        for i, vector in zip(batch, vectors):
+            encoded[i] = vector
+        _encode_totals["padded_tokens"] += len(batch) * int(lengths[batch].max())
+
+    _encode_totals["texts"] += len(texts)
+    _encode_totals["batches"] += len(batches)
+    _encode_totals["tokens"] += int(lengths.sum())
+    _encode_totals["seconds"] += time.perf_counter() - start
+    return dict(zip(texts, np.asarray(encoded, dtype=np.float32)))
+
+
+def encoder_cache_name(model, model_name=DEFAULT_MODEL_NAME):
+    """Name cached embeddings of model are stored under
+
+    The model name for the torch encoder; other backends (see
+    onnx_encoder.OnnxEncoder) give their own cache_name so their slightly
+    different vectors are never mixed with it.
+    """
+    return getattr(model, "cache_name", model_name)
+
+
+def encode_texts(texts, model, model_name=DEFAULT_MODEL_NAME, embedding_cache=None,
+                 batch_size=32, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Encode texts into a float32 matrix, reading/writing the embedding cache if given"""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    unique_texts = list(dict.fromkeys(texts))
+    cached = {}
+    cache_name = encoder_cache_name(model, model_name)
+    if embedding_cache is not None:
+        cached = embedding_cache.get_many(cache_name, unique_texts)
+    misses = [t for t in unique_texts if t not in cached]
+    if misses:
+        encoded = _encode_unique(misses, model, batch_size, token_budget)
+        if embedding_cache is not None:
+            # Use the vectors as the cache stores them, so cold and warm runs score alike
+            stored = embedding_cache.put_many(cache_name, misses, [encoded[t] for t in misses])
+            encoded = dict(zip(misses, stored))
+        cached.update(encoded)
+
+    return np.stack([cached[t] for t in texts])
+
+
+def cosine_scores(query_embedding, embeddings):
+    """Cosine similarity of one query vector against every row of a matrix
+
+    Computed the way sentence_transformers.util.cos_sim does (both sides unit
+    normalised, then one torch matrix product), so scoring a PDF's candidate
+    matrix gives bit-for-bit the scores, and exact ties, of the original
+    per-PDF scoring. A row's score can depend on the matrix around it, so
+    callers score one document's full candidate matrix at a time.
+    """
+    query = torch.from_numpy(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))
+    rows = torch.from_numpy(np.ascontiguousarray(embeddings, dtype=np.float32))
+    query = torch.nn.functional.normalize(query, p=2, dim=1)
+    rows = torch.nn.functional.normalize(rows, p=2, dim=1)
+    return torch.mm(query, rows.transpose(0, 1))[0].numpy()
+
+
+def cosine_score_matrix(query_embeddings, embeddings):
+    """Cosine similarity of every query row against every embedding row (queries x rows)
+
+    Each query is scored on its own through cosine_scores, so every row of
+    the result equals what a single-query run would compute.
+    """
+    return np.stack([cosine_scores(query, embeddings) for query in query_embeddings])
+
+
+def match_to_job_query(candidates, job_query, model_name=DEFAULT_MODEL_NAME, top_k=5,
+                       model=None, device=None, cache_dir=None, embedding_cache=None):
+    """Use semantic similarity to match heading candidates to a job query"""
     candidate_texts = [c["text"] for c in candidates]
 
     if not candidate_texts:
         return []
 
-    embeddings = model.encode(candidate_texts, convert_to_tensor=True)
-    query_embedding = model.encode(job_query, convert_to_tensor=True)
+    # Reuse the process-wide encoder instead of loading a new one per call
+    if model is None:
+        model = get_model(model_name, device=device, cache_dir=cache_dir)
+
+    embeddings = encode_texts(candidate_texts, model, model_name, embedding_cache)
+    query_embedding = encode_texts([job_query], model, model_name, embedding_cache)[0]
+
+    cos_scores = cosine_scores(query_embedding, embeddings)
+    return _top_matches(candidates, cos_scores, top_k)
 
-    cos_scores = util.cos_sim(query_embedding, embeddings)[0]
-    top_results = cos_scores.topk(k=min(top_k, len(candidate_texts)))
+
+def _top_matches(candidates, cos_scores, top_k):
+    """Turn a score vector aligned with candidates into the top-k match records
+
+    Each match carries "index", its position in candidates, so callers can
+    attach scores back to their own records without searching for them.
+    Selection goes through torch.topk as the original scoring did, which
+    also decides which of several equally scored candidates win.
+    """
+    scores = torch.from_numpy(np.ascontiguousarray(cos_scores, dtype=np.float32))
+    top_indices = scores.topk(k=min(top_k, len(candidates))).indices.tolist()
 
     top_matches = []
-    for idx, score in zip(top_results.indices, top_results.values):
+    for idx in top_indices:
         c = candidates[idx]
         top_matches.append({
             "text": c["text"],
-            "score": round(float(score), 3),
+            "score": round(float(cos_scores[idx]), 3),
             "page_num": c["page_num"],
-            "y": c["y"]
+            "y": c["y"],
+            "index": int(idx)
         })
 
     return top_matches
+
+
+def encode_collection(candidates_by_doc, model, model_name=DEFAULT_MODEL_NAME,
+                      embedding_cache=None, batch_size=64, precomputed=None,
+                      token_budget=DEFAULT_TOKEN_BUDGET):
+    """Return {doc: float32 matrix with one row per candidate}
+
+    Documents in precomputed (with one row per candidate) are reused as they
+    are; the texts of all other documents are deduplicated across the
+    collection and encoded in one batched pass.
+    """
+    precomputed = precomputed or {}
+    embeddings_by_doc = {}
+    pending = {}
+    for doc, cands in candidates_by_doc.items():
+        ready = precomputed.get(doc)
+        if ready is not None and len(ready) == len(cands):
+            embeddings_by_doc[doc] = ready
+        else:
+            pending[doc] = cands
+
+    unique_texts = list(dict.fromkeys(c["text"] for cands in pending.values() for c in cands))
+    if unique_texts:
+        text_index = {text: i for i, text in enumerate(unique_texts)}
+        embeddings = encode_texts(unique_texts, model, model_name, embedding_cache, batch_size,
+                                  token_budget)
+    for doc, cands in pending.items():
+        if cands:
+            embeddings_by_doc[doc] = embeddings[[text_index[c["text"]] for c in cands]]
+        else:
+            embeddings_by_doc[doc] = np.zeros((0, 0), dtype=np.float32)
+    return embeddings_by_doc
+
+
+def match_collection_to_job_query(candidates_by_doc, job_query, model_name=DEFAULT_MODEL_NAME,
+                                  top_k=5, model=None, device=None, cache_dir=None,
+                                  embedding_cache=None, batch_size=64, candidate_embeddings=None):
+    """Match every document's candidates against one query in a single batched pass
+
+    candidates_by_doc maps a document name to its candidate list. Texts are
+    deduplicated across the collection and encoded once, the query is encoded
+    once, and the resulting scores are split back into a per-document top-k
+    identical to calling match_to_job_query on each document.
+    candidate_embeddings ({doc: matrix}, see encode_collection) skips encoding
+    for the documents it covers.
+    """
+    results = {doc: [] for doc in candidates_by_doc}
+    if not any(candidates_by_doc.values()):
+        return results
+
+    if model is None:
+        model = get_model(model_name, device=device, cache_dir=cache_dir)
+
+    embeddings_by_doc = encode_collection(candidates_by_doc, model, model_name, embedding_cache,
+                                          batch_size, precomputed=candidate_embeddings)
+    query_embedding = encode_texts([job_query], model, model_name, embedding_cache)[0]
+
+    for doc, cands in candidates_by_doc.items():
+        if not cands:
+            continue
+        doc_scores = cosine_scores(query_embedding, embeddings_by_doc[doc])
+        results[doc] = _top_matches(cands, doc_scores, top_k)
+
+    return results
+
+
+def match_collection_to_queries(candidates_by_doc, queries, model_name=DEFAULT_MODEL_NAME,
+                                top_k=5, model=None, device=None, cache_dir=None,
+                                embedding_cache=None, batch_size=64, candidate_embeddings=None):
+    """Score several queries against a whole collection in one pass
+
+    Returns a list aligned with queries, each a {doc: top-k matches} dict like
+    match_collection_to_job_query returns. Candidates and queries are encoded
+    once (or taken from candidate_embeddings) and every document gets one
+    queries x candidates similarity matrix, whose rows are the scores a
+    single-query run computes.
+    """
+    results = [{doc: [] for doc in candidates_by_doc} for _ in queries]
+    docs = [doc for doc, cands in candidates_by_doc.items() if cands]
+    if not queries or not docs:
+        return results
+
+    if model is None:
+        model = get_model(model_name, device=device, cache_dir=cache_dir)
+
+    embeddings_by_doc = encode_collection(candidates_by_doc, model, model_name, embedding_cache,
+                                          batch_size, precomputed=candidate_embeddings)
+    query_embeddings = encode_texts(list(queries), model, model_name, embedding_cache)
+
+    for doc in docs:
+        scores = cosine_score_matrix(query_embeddings, embeddings_by_doc[doc])
+        for doc_scores, doc_results in zip(scores, results):
+            doc_results[doc] = _top_matches(candidates_by_doc[doc], doc_scores, top_k)
+    return results
+
+
+def match_collection_with_index(index, candidates_by_doc, job_query, candidate_embeddings,
+                                model_name=DEFAULT_MODEL_NAME, top_k=5, model=None,
+                                device=None, cache_dir=None, embedding_cache=None,
+                                shortlist=200, n_probe=None):
+    """ANN variant of match_collection_to_job_query for large corpora
+
+    index (see vector_index.IVFIndex) proposes the shortlist best candidates
+    over the whole corpus; only the documents that appear in it are ranked,
+    each with the exact per-document top-k. Documents without a shortlisted
+    candidate get no matches.
+    """
+    results = {doc: [] for doc in candidates_by_doc}
+    if model is None:
+        model = get_model(model_name, device=device, cache_dir=cache_dir)
+
+    query_embedding = encode_texts([job_query], model, model_name, embedding_cache)[0]
+    hits = index.search(query_embedding, k=shortlist, n_probe=n_probe)
+    for doc in dict.fromkeys(doc for _, doc, _ in hits):
+        cands = candidates_by_doc.get(doc)
+        if cands:
+            doc_scores = cosine_scores(query_embedding, candidate_embeddings[doc])
+            results[doc] = _top_matches(cands, doc_scores, top_k)
+    return results
+
+
+def match_collection_quantized(store, candidates_by_doc, job_query,
+                               model_name=DEFAULT_MODEL_NAME, top_k=5, model=None, device=None,
+                               cache_dir=None, embedding_cache=None):
+    """match_collection_to_job_query over compressed corpus embeddings
+
+    store (see quantized_embeddings.QuantizedEmbeddings) scores the query
+    against its int8/float16 codes and re-scores exactly every row that can
+    still make a document's top-k, so the matches are the same as exact
+    scoring; rows left out of the shortlist are never ranked. A document
+    whose leading shortlist scores (nearly) tie is scored exactly in full,
+    so ties resolve as they do without compression.
+    """
+    results = {doc: [] for doc in candidates_by_doc}
+    if model is None:
+        model = get_model(model_name, device=device, cache_dir=cache_dir)
+
+    query_embedding = encode_texts([job_query], model, model_name, embedding_cache)[0]
+    for doc, (rows, scores) in store.shortlist_scores(query_embedding, top_k).items():
+        cands = candidates_by_doc.get(doc)
+        if not cands:
+            continue
+        leading = np.sort(scores)[::-1][:top_k + 1]
+        if len(leading) > 1 and np.min(leading[:-1] - leading[1:]) < _TIE_TOLERANCE:
+            doc_scores = cosine_scores(query_embedding, store.doc_embeddings(doc))
+        else:
+            doc_scores = np.full(len(cands), -np.inf, dtype=np.float32)
+            doc_scores[rows] = scores
+        results[doc] = _top_matches(cands, doc_scores, top_k)
+    return results
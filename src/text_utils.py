@@ -1,4 +1,4 @@
-import re
+from functools import lru_cache
 
 
 def is_binary_data(text):
@@ -6,16 +6,28 @@ def is_binary_data(text):
     if not isinstance(text, str):
         return True
     
+    # Fast path: a fully printable string has no control characters at all
+    if text.isprintable():
+        return False
+    return _is_binary_slow(text)
+
+
+def _is_binary_slow(text):
+    """Single-pass version of the binary checks for strings with non-printable characters"""
+    printable_chars = 0
+    control_chars = 0
+    for c in text:
+        if c.isprintable() or c.isspace():
+            printable_chars += 1
+        if c < ' ' and c not in '\n\r\t':
+            control_chars += 1
+    
     # Check for high percentage of non-printable characters
-    printable_chars = sum(1 for c in text if c.isprintable() or c.isspace())
-    if len(text) > 0 and printable_chars / len(text) < 0.7:
+    if printable_chars / len(text) < 0.7:
         return True
     
     # Check for null bytes or other binary indicators
-    if '\x00' in text or len([c for c in text if ord(c) < 32 and c not in '\n\r\t']) > len(text) * 0.1:
-        return True
-        
-    return False
+    return '\x00' in text or control_chars > len(text) * 0.1
 
 
 def is_title_case(text):
@@ -33,29 +45,43 @@ def is_all_upper(text):
     return text.isupper() and any(c.isalpha() for c in text)
 
 
+def split_words(text):
+    """Split text into words the way clean_text does (non-printable characters dropped)"""
+    if text.isprintable():
+        return text.split()
+    # Remove non-printable characters except common whitespace, then
+    # split, which also normalizes tabs/newlines/runs of spaces.
+    # (What is left is printable, so it can no longer look like binary data.)
+    return ''.join(char for char in text if char.isprintable() or char in '\n\r\t ').split()
+
+
 def clean_text(text, max_words=150):
     """Clean and truncate text to a reasonable length"""
     if not isinstance(text, str):
         return ""
     
-    # Filter out binary data
-    if is_binary_data(text):
-        return ""
-    
-    # Remove non-printable characters except common whitespace
-    cleaned = ''.join(char for char in text if char.isprintable() or char in '\n\r\t ')
-    
-    # Replace tabs and normalize whitespace
-    cleaned = cleaned.replace('\t', ' ')
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    
-    # Check again after cleaning
-    if is_binary_data(cleaned):
-        return ""
+    # Short strings (spans, running headers) repeat a lot, so they are memoised
+    if len(text) <= _CLEAN_CACHE_MAX_LEN:
+        return _clean_text_cached(text, max_words)
+    return _clean_text(text, max_words)
+
+
+_CLEAN_CACHE_MAX_LEN = 256
+
+
+def _clean_text(text, max_words):
+    if text.isprintable():
+        # Nothing to strip: the only whitespace a printable string can hold is ' '
+        words = text.split()
+    else:
+        # Filter out binary data
+        if _is_binary_slow(text):
+            return ""
+        
+        words = split_words(text)
 
-    words = cleaned.split()
     if len(words) <= max_words:
-        return cleaned.strip()
+        return " ".join(words)
     
     # Find the index for the first word after the threshold
     prefix = words[:max_words]
@@ -72,13 +98,20 @@ def clean_text(text, max_words=150):
     
     if not found_period:
         # If no period found, just use what we have (avoid infinite strings)
-        return " ".join(prefix + collected).strip() + " ..."
+        return " ".join(prefix + collected) + " ..."
     
-    return " ".join(prefix + collected).strip()
+    return " ".join(prefix + collected)
+
+
+_clean_text_cached = lru_cache(maxsize=8192)(_clean_text)
 
 
 def is_bold_font(span):
     """Check if a text span uses bold formatting"""
     bold_flag = (span["flags"] & 2) != 0
-    bold_name = any(word in span["font"].lower() for word in ["bold", "black", "heavy"])
-    return bold_flag or bold_name
+    return bold_flag or is_bold_font_name(span["font"])
+
+
+def is_bold_font_name(font):
+    """Check if a font name denotes a bold weight"""
+    return any(word in font.lower() for word in ["bold", "black", "heavy"])
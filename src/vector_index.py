@@ -0,0 +1,178 @@
+import numpy as np
+
+# Rows scored per matrix product while assigning vectors to lists
+_ASSIGN_CHUNK = 8192
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-8)
+    return vectors / norms
+
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index, built in-process with NumPy
+
+    Vectors are stored unit-normalised per document (doc_id) and grouped into
+    n_lists clusters by spherical k-means; a search scores only the vectors of
+    the n_probe clusters closest to the query. Documents can be added and
+    removed at any time; until train() has run, search is exact.
+    """
+
+    def __init__(self, n_lists=None, n_probe=16, train_iterations=10, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_iterations = train_iterations
+        self.seed = seed
+        self.centroids = None
+        self._vectors = {}      # doc_id -> (rows, dim) normalised vectors
+        self._assignments = {}  # doc_id -> list id of each row
+        self._doc_codes = {}    # doc_id -> int code used in packed lists
+        self._doc_ids = []      # code -> doc_id (None once removed)
+        self._lists = [{}]      # list id -> {doc code: row indices}
+        self._packed = {}       # list id -> (vectors, doc codes, rows), rebuilt lazily
+
+    def __len__(self):
+        return sum(len(vectors) for vectors in self._vectors.values())
+
+    def __contains__(self, doc_id):
+        return doc_id in self._vectors
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def _assign(self, vectors):
+        if self.centroids is None:
+            return np.zeros(len(vectors), dtype=np.int64)
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), _ASSIGN_CHUNK):
+            chunk = vectors[start:start + _ASSIGN_CHUNK]
+            assignments[start:start + len(chunk)] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return assignments
+
+    def _file(self, doc_id, assignments):
+        code = self._doc_codes[doc_id]
+        for list_id in np.unique(assignments).tolist():
+            self._lists[list_id][code] = np.flatnonzero(assignments == list_id)
+            self._packed.pop(list_id, None)
+
+    def add(self, doc_id, embeddings):
+        """Index a document's embeddings (one row per candidate), replacing any previous ones"""
+        if doc_id in self._vectors:
+            self.remove(doc_id)
+        vectors = _normalize(embeddings)
+        if not len(vectors):
+            return
+        if doc_id not in self._doc_codes:
+            self._doc_codes[doc_id] = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+        self._vectors[doc_id] = vectors
+        self._assignments[doc_id] = self._assign(vectors)
+        self._file(doc_id, self._assignments[doc_id])
+
+    def remove(self, doc_id):
+        """Drop a document from the index (no-op if it is not there)"""
+        if doc_id not in self._vectors:
+            return
+        code = self._doc_codes.pop(doc_id)
+        self._doc_ids[code] = None
+        for list_id in np.unique(self._assignments.pop(doc_id)).tolist():
+            self._lists[list_id].pop(code, None)
+            self._packed.pop(list_id, None)
+        del self._vectors[doc_id]
+
+    def train(self, n_lists=None, sample_size=None):
+        """Cluster the stored vectors and re-file every document
+
+        n_lists defaults to about sqrt(N); k-means runs on a random sample
+        of at most sample_size (default 64 * n_lists) vectors.
+        """
+        total = len(self)
+        if total == 0:
+            return
+        n_lists = n_lists or self.n_lists or int(np.sqrt(total))
+        n_lists = max(1, min(n_lists, total))
+
+        rng = np.random.default_rng(self.seed)
+        data = np.concatenate(list(self._vectors.values()))
+        sample_size = min(total, sample_size or 64 * n_lists)
+        sample = data[rng.choice(total, size=sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+
+        for _ in range(self.train_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            present, starts = np.unique(labels[order], return_index=True)
+            sums = np.zeros_like(centroids)
+            sums[present] = np.add.reduceat(sample[order], starts)
+            empty = np.ones(n_lists, dtype=bool)
+            empty[present] = False
+            # Re-seed empty clusters from random sample points
+            sums[empty] = sample[rng.choice(sample_size, size=int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        self.centroids = centroids
+        self.n_lists = n_lists
+        self._lists = [{} for _ in range(n_lists)]
+        self._packed = {}
+        for doc_id, vectors in self._vectors.items():
+            self._assignments[doc_id] = self._assign(vectors)
+            self._file(doc_id, self._assignments[doc_id])
+
+    def _packed_list(self, list_id):
+        packed = self._packed.get(list_id)
+        if packed is None:
+            entries = self._lists[list_id]
+            if entries:
+                vectors = np.concatenate([self._vectors[self._doc_ids[code]][rows]
+                                          for code, rows in entries.items()])
+                codes = np.concatenate([np.full(len(rows), code, dtype=np.int64)
+                                        for code, rows in entries.items()])
+                rows = np.concatenate(list(entries.values()))
+            else:
+                vectors = np.zeros((0, 0), dtype=np.float32)
+                codes = rows = np.zeros(0, dtype=np.int64)
+            packed = (vectors, codes, rows)
+            self._packed[list_id] = packed
+        return packed
+
+    def search(self, query_embedding, k=10, n_probe=None):
+        """Return up to k (score, doc_id, row) by descending cosine similarity"""
+        query = _normalize(query_embedding)[0]
+        if self.centroids is None:
+            probed = [0]
+        else:
+            n_probe = min(n_probe or self.n_probe, self.n_lists)
+            centroid_scores = self.centroids @ query
+            probed = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe].tolist()
+
+        scores, codes, rows = [], [], []
+        for list_id in probed:
+            vectors, list_codes, list_rows = self._packed_list(list_id)
+            if len(list_rows):
+                scores.append(vectors @ query)
+                codes.append(list_codes)
+                rows.append(list_rows)
+        if not scores:
+            return []
+        scores = np.concatenate(scores)
+        codes = np.concatenate(codes)
+        rows = np.concatenate(rows)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), self._doc_ids[codes[i]], int(rows[i])) for i in top]
+
+
+def build_index(embeddings_by_doc, n_probe=16, min_train_size=4096):
+    """Index every document's embeddings; cluster once there are enough vectors"""
+    index = IVFIndex(n_probe=n_probe)
+    for doc_id, embeddings in embeddings_by_doc.items():
+        index.add(doc_id, embeddings)
+    if len(index) >= min_train_size:
+        index.train()
+    return index